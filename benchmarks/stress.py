@@ -0,0 +1,293 @@
+"""Replay randomized DataTables draws concurrently and report throughput.
+
+Usage::
+
+    $ python -m benchmarks.stress --threads 100 --draws 5000
+    $ python -m benchmarks.stress --url postgresql://localhost/bench --processes 4
+
+Without `--url`, a file-backed SQLite database is created in a temporary
+directory and populated with `--rows` customers.
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import (
+    Column,
+    Date,
+    ForeignKey,
+    Integer,
+    Numeric,
+    String,
+    create_engine,
+    event,
+)
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from datatables import ColumnDT, DataTables
+
+Base = declarative_base()
+
+CITIES = ["Paris", "Lyon", "Marseille", "Lille", "Nantes", "Bordeaux", "Nice"]
+SYLLABLES = ["ma", "ri", "lo", "ne", "ta", "chi", "ber", "son", "du", "pont"]
+LENGTHS = [10, 10, 10, 25, 50, 100]
+
+
+class City(Base):
+    __tablename__ = "stress_cities"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50), unique=True)
+
+
+class Customer(Base):
+    __tablename__ = "stress_customers"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), index=True)
+    balance = Column(Numeric(12, 2), index=True)
+    birthday = Column(Date)
+    city_id = Column(Integer, ForeignKey("stress_cities.id"), nullable=False)
+
+
+COLUMNS = [
+    ColumnDT(Customer.id, search_method="yadcf_range_number"),
+    ColumnDT(Customer.name),
+    ColumnDT(City.name, search_method="yadcf_select"),
+    ColumnDT(Customer.balance, search_method="numeric"),
+    ColumnDT(Customer.birthday, search_method="yadcf_range_date"),
+]
+
+
+def populate(engine, rows, seed=0):
+    """Create the tables and insert the cities and customers missing."""
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    if session.query(Customer).count() >= rows:
+        session.close()
+        return
+    rand = random.Random(seed)
+    city_ids = {city_id for (city_id,) in session.query(City.id)}
+    cities = [City(id=i + 1, name=name) for i, name in enumerate(CITIES)]
+    session.add_all([city for city in cities if city.id not in city_ids])
+    session.flush()
+    # the same values as a first run, for the ids not inserted yet
+    customer_ids = {customer_id for (customer_id,) in session.query(Customer.id)}
+    mappings = [
+        {
+            "id": i + 1,
+            "name": "".join(rand.choice(SYLLABLES) for _ in range(4)) + str(i),
+            "balance": round(rand.uniform(-1000, 100000), 2),
+            "birthday": datetime.date(1950, 1, 1)
+            + datetime.timedelta(days=rand.randrange(20000)),
+            "city_id": rand.randrange(len(cities)) + 1,
+        }
+        for i in range(rows)
+    ]
+    mappings = [m for m in mappings if m["id"] not in customer_ids]
+    session.bulk_insert_mappings(Customer, mappings)
+    session.commit()
+    session.close()
+
+
+def random_params(rand, rows):
+    """Return the parameters of a realistic randomized draw."""
+    length = rand.choice(LENGTHS)
+    # most users stay on the first pages, some jump deep
+    if rand.random() < 0.8:
+        start = length * rand.randrange(5)
+    else:
+        start = rand.randrange(max(rows - length, 1))
+    params = {
+        "draw": str(rand.randrange(1, 1000)),
+        "start": str(start),
+        "length": str(length),
+        "search[value]": "",
+        "search[regex]": "false",
+        "order[0][column]": str(rand.randrange(len(COLUMNS))),
+        "order[0][dir]": rand.choice(["asc", "desc"]),
+    }
+    for i in range(len(COLUMNS)):
+        params["columns[{:d}][search][value]".format(i)] = ""
+    if rand.random() < 0.4:
+        params["search[value]"] = "".join(rand.choice(SYLLABLES) for _ in range(2))
+    if rand.random() < 0.3:
+        params["columns[2][search][value]"] = rand.choice(CITIES)
+    if rand.random() < 0.2:
+        low = rand.randrange(0, 50000)
+        params["columns[3][search][value]"] = ">={:d}".format(low)
+    if rand.random() < 0.2:
+        params["columns[4][search][value]"] = "1970-01-01-yadcf_delim-1990-12-31"
+    if rand.random() < 0.1:
+        params["columns[0][search][value]"] = "{:d}-yadcf_delim-".format(
+            rand.randrange(rows)
+        )
+    return params
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    rank = max(int(round(percent / 100.0 * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def run_draws(url, draws, threads, rows, seed, pool_size):
+    """Run draws from a pool of threads and return their measures."""
+    engine = create_engine(url, pool_size=pool_size, max_overflow=0)
+    statements = threading.local()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, many):
+        statements.count = getattr(statements, "count", 0) + 1
+
+    Session = sessionmaker(bind=engine)
+    query = Session().query().select_from(Customer).join(City)
+
+    def draw(i):
+        rand = random.Random(seed * 1000003 + i)
+        params = random_params(rand, rows)
+        session = Session()
+        statements.count = 0
+        started = time.perf_counter()
+        try:
+            session.connection()
+            acquired = time.perf_counter()
+            table = DataTables(params, query.with_session(session), COLUMNS)
+            finished = time.perf_counter()
+        finally:
+            session.close()
+        return {
+            "latency": finished - started,
+            "pool_wait": acquired - started,
+            "statements": statements.count,
+            "error": table.error,
+        }
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        measures = list(executor.map(draw, range(draws)))
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return elapsed, measures
+
+
+def _run_process(args):
+    return run_draws(*args)
+
+
+def report(elapsed, measures, processes, threads):
+    """Summarize the measures of a run."""
+    latencies = [m["latency"] * 1000 for m in measures]
+    pool_waits = [m["pool_wait"] * 1000 for m in measures]
+    errors = [m["error"] for m in measures if m["error"]]
+    return {
+        "draws": len(measures),
+        "processes": processes,
+        "threads": threads,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "throughput": len(measures) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+        },
+        "pool_wait_ms": {
+            "p50": percentile(pool_waits, 50),
+            "p95": percentile(pool_waits, 95),
+            "p99": percentile(pool_waits, 99),
+        },
+        "statements_per_draw": (
+            sum(m["statements"] for m in measures) / float(len(measures))
+            if measures
+            else 0.0
+        ),
+    }
+
+
+def run(
+    url=None, rows=10000, draws=1000, threads=50, processes=1, seed=0, pool_size=10
+):
+    """Populate the database, replay the draws and return the report."""
+    if url is None:
+        # a temporary SQLite database, removed with its directory
+        with tempfile.TemporaryDirectory(prefix="datatables-stress-") as tmpdir:
+            url = "sqlite:///" + os.path.join(tmpdir, "stress.sqlite")
+            return run(url, rows, draws, threads, processes, seed, pool_size)
+
+    engine = create_engine(url)
+    populate(engine, rows, seed)
+    engine.dispose()
+
+    per_process = [draws // processes] * processes
+    per_process[0] += draws - sum(per_process)
+    jobs = [
+        (url, n, threads, rows, seed + p, pool_size) for p, n in enumerate(per_process)
+    ]
+    started = time.perf_counter()
+    if processes == 1:
+        results = [_run_process(jobs[0])]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(_run_process, jobs)
+    elapsed = time.perf_counter() - started
+
+    measures = [m for _, process_measures in results for m in process_measures]
+    return report(elapsed, measures, processes, threads)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="database URL (default temporary SQLite)")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--draws", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="output JSON")
+    args = parser.parse_args(argv)
+
+    result = run(
+        url=args.url,
+        rows=args.rows,
+        draws=args.draws,
+        threads=args.threads,
+        processes=args.processes,
+        seed=args.seed,
+        pool_size=args.pool_size,
+    )
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(
+        "{draws} draws, {processes} process(es) x {threads} threads, "
+        "{errors} error(s)".format(**result)
+    )
+    print("throughput:          {:.1f} draws/s".format(result["throughput"]))
+    for key, title in [("latency_ms", "latency"), ("pool_wait_ms", "pool wait")]:
+        print(
+            "{:<20} p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms".format(
+                title + ":", **result[key]
+            )
+        )
+    print("statements per draw: {:.2f}".format(result["statements_per_draw"]))
+    if result["first_error"]:
+        print("first error:         {}".format(result["first_error"]))
+
+
+if __name__ == "__main__":
+    main()
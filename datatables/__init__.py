@@ -1,6 +1,16 @@
 from __future__ import absolute_import
 
 from datatables.column_dt import ColumnDT
+from datatables.counts import CountRegistry, TrackedCount
 from datatables.datatables import DataTables
+from datatables.sharding import ShardedDataTables
+from datatables.spec import DataTablesSpec
 
-__all__ = ["ColumnDT", "DataTables"]
+__all__ = [
+    "ColumnDT",
+    "CountRegistry",
+    "DataTables",
+    "DataTablesSpec",
+    "ShardedDataTables",
+    "TrackedCount",
+]
@@ -38,3 +38,23 @@ def clean_regex(regex):
 
     # and back to the caller
     return ret_regex
+
+
+def literal_alternatives(regex):
+    """
+    Split a regex cleaned by clean_regex into its literal alternatives.
+
+    :param regex: regex returned by clean_regex
+    :type regex: str
+    :rtype: list of str, without escapes
+    """
+    alternatives = [""]
+    chars = iter(regex)
+    for c in chars:
+        if c == "\\":
+            alternatives[-1] += next(chars, "")
+        elif c == "|":
+            alternatives.append("")
+        else:
+            alternatives[-1] += c
+    return alternatives
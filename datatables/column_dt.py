@@ -2,7 +2,10 @@ from __future__ import absolute_import
 
 from collections import namedtuple
 
-from datatables.search_methods import SEARCH_METHODS
+from sqlalchemy.orm import RelationshipProperty
+
+from datatables.formatters import as_formatter
+from datatables.search_methods import DATE_SEARCH_METHODS, SEARCH_METHODS
 
 NULLS_ORDER = ["nullsfirst", "nullslast"]
 
@@ -15,6 +18,9 @@ ColumnTuple = namedtuple(
         "search_method",
         "nulls_order",
         "global_search",
+        "date_format",
+        "formatter",
+        "related",
     ],
 )
 
@@ -48,12 +54,26 @@ class ColumnDT(ColumnTuple):
             - 'nullsfirst'
             - 'nullslast'.
     :param global_search: search this column for the global search box
+    :param date_format: strptime format of the search values of the 'date'
+        and 'yadcf_range_date' search methods (default None, ISO 8601 or
+        any format understood by dateutil)
+    :param formatter: format the values of the column for display, with a
+        `datatables.formatters.Formatter`, pushed down to SQL when the dialect
+        supports it, or a python function called with each value; sorts and
+        searches still use the raw expression (default None)
+    :param related: relationship from the base entity of the query to the
+        entity of `sqla_expr`, which isn't joined by the query: searches
+        compile to correlated EXISTS subqueries, and the column shows the
+        related values separated by commas (default None)
 
     :type sqla_expr: SQLAlchemy query expression
     :type mData: str
     :type search_method: str
     :type nulls_order: str
     :type global_search: bool
+    :type date_format: str
+    :type formatter: datatables.formatters.Formatter or callable
+    :type related: SQLAlchemy relationship attribute
 
     :return: a ColumnDT object
     :rtype: ColumnDT
@@ -67,6 +87,9 @@ class ColumnDT(ColumnTuple):
         search_method="string_contains",
         nulls_order=None,
         global_search=True,
+        date_format=None,
+        formatter=None,
+        related=None,
     ):
         """Set default values due to namedtuple immutability."""
         if nulls_order and nulls_order not in NULLS_ORDER:
@@ -79,6 +102,16 @@ class ColumnDT(ColumnTuple):
                 "{} is not an allowed value for search_method.".format(search_method)
             )
 
+        if date_format and search_method not in DATE_SEARCH_METHODS:
+            raise ValueError(
+                "date_format is not allowed for search_method {}.".format(search_method)
+            )
+
+        if related is not None and not isinstance(
+            getattr(related, "property", None), RelationshipProperty
+        ):
+            raise ValueError("{!r} is not a relationship.".format(related))
+
         return super(ColumnDT, cls).__new__(
             cls,
             sqla_expr,
@@ -87,4 +120,7 @@ class ColumnDT(ColumnTuple):
             search_method,
             nulls_order,
             global_search,
+            date_format,
+            as_formatter(formatter),
+            related,
         )
@@ -0,0 +1,107 @@
+from __future__ import absolute_import
+
+import threading
+from contextlib import contextmanager
+
+from datatables.dialects import cancel_statement
+
+
+class DrawSuperseded(Exception):
+    """Raised when a newer draw started for the same page and table."""
+
+
+class DrawToken:
+    """In-flight draw registered with a DrawCoordinator.
+
+    :param key: page/table key the draw belongs to
+    :param draw: `draw` counter sent by DataTables
+    """
+
+    def __init__(self, key, draw):
+        self.key = key
+        self.draw = draw
+        self.superseded = False
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def supersede(self):
+        """Mark the draw as superseded and cancel its running statements."""
+        with self._lock:
+            self.superseded = True
+            connections = list(self._connections)
+        for connection in connections:
+            cancel_statement(connection)
+
+    def check(self):
+        """Raise DrawSuperseded if a newer draw started."""
+        if self.superseded:
+            raise DrawSuperseded(
+                "Draw {} superseded for {}".format(self.draw, self.key)
+            )
+
+    @contextmanager
+    def watch(self, connection):
+        """Cancel the statements run on `connection` if superseded."""
+        with self._lock:
+            self._connections.append(connection)
+        try:
+            self.check()
+            yield
+        except Exception:
+            # the error is most likely the cancellation of the statement
+            self.check()
+            raise
+        finally:
+            with self._lock:
+                self._connections.remove(connection)
+
+
+class DrawCoordinator:
+    """Coordinate the draws of the same page and table.
+
+    DataTables discards any response with an older `draw`, so the newest
+    draw to arrive for a key supersedes the one in flight: its running
+    statement is cancelled and its remaining statements are skipped.
+    Arrivals are compared rather than `draw` counters, which restart at 1 on
+    each page load.
+
+    A superseded draw outputs no rows, so the key has to identify one page
+    instance: two tabs sharing a key would empty each other's grid. Send an
+    id generated on page load, for example with `ajax.data`.
+
+    Usage::
+
+        coordinator = DrawCoordinator()
+
+        rowTable = DataTables(
+            request.GET,
+            query,
+            columns,
+            coordinator=coordinator,
+            coordination_key=(request.GET["page_id"], "users"),
+        )
+    """
+
+    def __init__(self):
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key, draw):
+        """Register a draw, superseding the draw in flight for the same key.
+
+        :returns: the token of the draw
+        :rtype: DrawToken
+        """
+        token = DrawToken(key, draw)
+        with self._lock:
+            current = self._tokens.get(key)
+            self._tokens[key] = token
+        if current is not None:
+            current.supersede()
+        return token
+
+    def end(self, token):
+        """Unregister a finished draw."""
+        with self._lock:
+            if self._tokens.get(token.key) is token:
+                del self._tokens[token.key]
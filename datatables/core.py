@@ -0,0 +1,104 @@
+from __future__ import absolute_import
+
+from contextlib import contextmanager
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection
+
+
+class CoreQuery:
+    """Core select statement with the part of the ORM Query API DataTables uses.
+
+    Filters, sorts, counts and paging are built directly on the statement,
+    which is executed on a Connection, or on a connection of an Engine, and
+    rows are returned as plain tuples without ORM row processing.
+
+    :param statement: select statement wanted to be seen in the table
+    :param bind: connection or engine to run the statement on
+    :type statement: sqlalchemy.sql.Select
+    :type bind: sqlalchemy.engine.Connection or sqlalchemy.engine.Engine
+    """
+
+    def __init__(self, statement, bind):
+        self.statement = statement
+        self.bind = bind
+        self._yield_per = None
+
+    def _generate(self, statement):
+        query = CoreQuery(statement, self.bind)
+        query._yield_per = self._yield_per
+        return query
+
+    @property
+    def dialect(self):
+        return self.bind.dialect
+
+    @property
+    def engine(self):
+        return self.bind.engine if isinstance(self.bind, Connection) else self.bind
+
+    def with_bind(self, bind):
+        """Return the same query, run on another connection or engine."""
+        query = self._generate(self.statement)
+        query.bind = bind
+        return query
+
+    @contextmanager
+    def connect(self):
+        """Yield the connection to run the statement on."""
+        if isinstance(self.bind, Connection):
+            yield self.bind
+        else:
+            with self.bind.connect() as connection:
+                yield connection
+
+    def filter(self, *criteria):
+        return self._generate(self.statement.where(*criteria))
+
+    def join(self, target, *props, **kwargs):
+        return self._generate(self.statement.join(target, *props, **kwargs))
+
+    def order_by(self, *clauses):
+        return self._generate(self.statement.order_by(*clauses))
+
+    def group_by(self, *clauses):
+        return self._generate(self.statement.group_by(*clauses))
+
+    def limit(self, limit):
+        return self._generate(self.statement.limit(limit))
+
+    def offset(self, offset):
+        return self._generate(self.statement.offset(offset))
+
+    def distinct(self):
+        return self._generate(self.statement.distinct())
+
+    def add_columns(self, *columns):
+        return self._generate(self.statement.add_columns(*columns))
+
+    def yield_per(self, count):
+        """Stream the rows from a server-side cursor, `count` at a time."""
+        query = self._generate(self.statement)
+        query._yield_per = count
+        return query
+
+    def count(self):
+        statement = select(func.count()).select_from(self.statement.subquery())
+        with self.connect() as connection:
+            return connection.execute(statement).scalar_one()
+
+    def one(self):
+        with self.connect() as connection:
+            return connection.execute(self.statement).one()
+
+    def all(self):
+        with self.connect() as connection:
+            return connection.execute(self.statement).all()
+
+    def __iter__(self):
+        options = {}
+        if self._yield_per is not None:
+            options = {"stream_results": True, "yield_per": self._yield_per}
+        with self.connect() as connection:
+            for row in connection.execute(self.statement, execution_options=options):
+                yield row
@@ -0,0 +1,312 @@
+from __future__ import absolute_import
+
+import threading
+import time
+import weakref
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+
+class TrackedCount:
+    """Row count of a base query maintained in memory from ORM events.
+
+    The count is seeded with a real count the first time it is needed, then
+    adjusted when instances of the entity are inserted, deleted or updated
+    in or out of the predicate on the database of `bind`, and the session
+    commits. It is counted again when it is older than `reconcile_every`
+    seconds, or when a change can't be accounted for (bulk statements
+    touching filtered rows, bulk methods of the session, rollbacks).
+
+    :param entity: mapped class of the single table of the base query
+    :param bind: engine of the database the base query runs on
+    :param predicate: callable telling whether an instance is counted by the
+        static filters of the base query (default None, every row counts)
+    :param reconcile_every: maximum age in seconds of the count before it is
+        counted again (default 300, None to never reconcile)
+
+    :type entity: class
+    :type bind: sqlalchemy.engine.Engine
+    :type predicate: callable
+    :type reconcile_every: float
+    """
+
+    def __init__(self, entity, bind, predicate=None, reconcile_every=300.0):
+        self.entity = entity
+        self.bind = _engine(bind)
+        self.predicate = predicate
+        self.reconcile_every = reconcile_every
+        self._count = None
+        self._counted_at = None
+        self._lock = threading.Lock()
+
+    def get(self, counter):
+        """Return the count, calling `counter` when it has to be counted."""
+        with self._lock:
+            if not self._stale():
+                return self._count
+        count = counter()
+        with self._lock:
+            self._count = count
+            self._counted_at = time.monotonic()
+        return count
+
+    @property
+    def last_known(self):
+        """Return the count without counting, None if not known."""
+        with self._lock:
+            return self._count
+
+    def invalidate(self):
+        """Count again on next access."""
+        with self._lock:
+            self._count = None
+
+    def _stale(self):
+        if self._count is None:
+            return True
+        if self.reconcile_every is None:
+            return False
+        return time.monotonic() - self._counted_at >= self.reconcile_every
+
+    def _counts(self, instance):
+        return self.predicate is None or bool(self.predicate(instance))
+
+    def _apply(self, delta):
+        with self._lock:
+            if self._count is not None:
+                self._count += delta
+
+
+class CountRegistry:
+    """Registry of counts maintained from ORM and session events.
+
+    Changes are collected per session while flushing or executing bulk
+    statements and applied when the session commits, so that rolled back
+    changes never reach the counts. Writes of the bulk methods of the
+    session, such as `bulk_insert_mappings`, don't go through any ORM event:
+    they are caught from the statements run on the engine, and invalidate
+    the counts at commit.
+
+    Usage::
+
+        counts = CountRegistry()
+        counts.track("users", User, engine)
+
+        rowTable = DataTables(
+            request.GET, query, columns, tracked_count=counts["users"]
+        )
+    """
+
+    def __init__(self):
+        self._tracked = {}
+        self._listeners = []
+        self._info_key = "datatables_counts_{:d}".format(id(self))
+        # set on a session while its writes are accounted for by ORM events
+        self._busy_key = self._info_key + "_busy"
+        self._listen(Session, "after_begin", self._after_begin)
+        self._listen(Session, "before_flush", self._before_flush)
+        self._listen(Session, "after_flush", self._after_flush)
+        self._listen(Session, "after_soft_rollback", self._after_soft_rollback)
+        self._listen(Session, "after_commit", self._after_commit)
+        self._listen(Session, "after_rollback", self._after_rollback)
+        self._listen(Session, "do_orm_execute", self._do_orm_execute)
+
+    def __getitem__(self, name):
+        return self._tracked[name]
+
+    def __contains__(self, name):
+        return name in self._tracked
+
+    def track(self, name, entity, bind, predicate=None, reconcile_every=300.0):
+        """Declare the count of a base query over `entity` as tracked.
+
+        Only the writes to the database of `bind` change the count.
+
+        :returns: the TrackedCount to give to DataTables
+        :rtype: TrackedCount
+        """
+        if name in self._tracked:
+            raise ValueError("{} is already tracked.".format(name))
+        if not any(t.entity is entity for t in self._tracked.values()):
+            self._listen(entity, "after_insert", self._after_insert, propagate=True)
+            self._listen(entity, "after_delete", self._after_delete, propagate=True)
+            self._listen(entity, "after_update", self._after_update, propagate=True)
+        if not any(t.bind is _engine(bind) for t in self._tracked.values()):
+            self._listen(
+                _engine(bind), "after_cursor_execute", self._after_cursor_execute
+            )
+        tracked = TrackedCount(entity, bind, predicate, reconcile_every)
+        self._tracked[name] = tracked
+        return tracked
+
+    def close(self):
+        """Remove every event listener installed by the registry."""
+        for target, identifier, fn in self._listeners:
+            event.remove(target, identifier, fn)
+        self._listeners = []
+        self._tracked = {}
+
+    def _listen(self, target, identifier, fn, **kw):
+        event.listen(target, identifier, fn, **kw)
+        self._listeners.append((target, identifier, fn))
+
+    def _tracking(self, cls, bind):
+        return [
+            t
+            for t in self._tracked.values()
+            if issubclass(cls, t.entity) and t.bind is _engine(bind)
+        ]
+
+    def _pending(self, session):
+        return session.info.setdefault(self._info_key, {})
+
+    def _record(self, target, connection, delta):
+        session = Session.object_session(target)
+        if session is None:
+            return
+        pending = self._pending(session)
+        for tracked in self._tracking(type(target), connection):
+            if tracked._counts(target) and pending.get(tracked, 0) is not None:
+                pending[tracked] = pending.get(tracked, 0) + delta
+
+    def _after_insert(self, mapper, connection, target):
+        self._record(target, connection, 1)
+
+    def _after_delete(self, mapper, connection, target):
+        self._record(target, connection, -1)
+
+    def _after_update(self, mapper, connection, target):
+        # an update only changes the counts with a predicate, when the row
+        # moves in or out of it
+        session = Session.object_session(target)
+        if session is None:
+            return
+        pending = self._pending(session)
+        for tracked in self._tracking(type(target), connection):
+            if tracked.predicate is None or pending.get(tracked, 0) is None:
+                continue
+            try:
+                before = tracked._counts(_Previous(target))
+            except _UnknownPrevious:
+                # None counts again at commit
+                pending[tracked] = None
+                continue
+            delta = int(tracked._counts(target)) - int(before)
+            pending[tracked] = pending.get(tracked, 0) + delta
+
+    def _after_begin(self, session, transaction, connection):
+        # the session of the statements run on the connection
+        connection.info[self._info_key] = weakref.ref(session)
+
+    def _busy(self, session, busy):
+        # a flush can run within an ORM statement, on its autoflush
+        depth = session.info.get(self._busy_key, 0) + (1 if busy else -1)
+        session.info[self._busy_key] = max(depth, 0)
+
+    def _before_flush(self, session, flush_context, instances):
+        self._busy(session, True)
+
+    def _after_flush(self, session, flush_context):
+        self._busy(session, False)
+
+    def _after_soft_rollback(self, session, previous_transaction):
+        # a failed flush doesn't reach after_flush
+        session.info.pop(self._busy_key, None)
+
+    def _after_cursor_execute(
+        self, connection, cursor, statement, parameters, context, executemany
+    ):
+        # writes neither flushed nor executed as ORM statements, such as the
+        # ones of Session.bulk_insert_mappings()
+        compiled = getattr(context, "compiled", None)
+        if compiled is None or not (
+            context.isinsert or context.isupdate or context.isdelete
+        ):
+            return
+        session = connection.info.get(self._info_key, lambda: None)()
+        if session is None or session.info.get(self._busy_key):
+            return
+        table = getattr(compiled.statement, "table", None)
+        pending = self._pending(session)
+        for tracked in self._tracked.values():
+            if tracked.bind is not connection.engine or not any(
+                table is t for t in inspect(tracked.entity).tables
+            ):
+                continue
+            if context.isupdate and tracked.predicate is None:
+                continue
+            # None counts again at commit
+            pending[tracked] = None
+
+    def _after_commit(self, session):
+        for tracked, delta in session.info.pop(self._info_key, {}).items():
+            if delta is None:
+                tracked.invalidate()
+            else:
+                tracked._apply(delta)
+
+    def _after_rollback(self, session):
+        # the pending changes may be partially rolled back (savepoints)
+        for tracked in session.info.pop(self._info_key, {}):
+            tracked.invalidate()
+
+    def _do_orm_execute(self, orm_execute_state):
+        # bulk statements don't go through the mapper events
+        mapper = orm_execute_state.bind_mapper
+        if mapper is None or not (
+            orm_execute_state.is_insert
+            or orm_execute_state.is_update
+            or orm_execute_state.is_delete
+        ):
+            return None
+        session = orm_execute_state.session
+        bind = session.get_bind(**orm_execute_state.bind_arguments)
+        tracking = self._tracking(mapper.class_, bind)
+        if not tracking:
+            return None
+
+        self._busy(session, True)
+        try:
+            result = orm_execute_state.invoke_statement()
+        finally:
+            self._busy(session, False)
+        rowcount = getattr(result, "rowcount", -1)
+        pending = self._pending(session)
+        for tracked in tracking:
+            if orm_execute_state.is_update:
+                if tracked.predicate is not None:
+                    tracked.invalidate()
+            elif tracked.predicate is None and rowcount >= 0:
+                if pending.get(tracked, 0) is not None:
+                    delta = rowcount if orm_execute_state.is_insert else -rowcount
+                    pending[tracked] = pending.get(tracked, 0) + delta
+            else:
+                tracked.invalidate()
+        return result
+
+
+def _engine(bind):
+    """Return the engine of an engine or a connection."""
+    return getattr(bind, "engine", bind)
+
+
+class _UnknownPrevious(Exception):
+    """The value of an attribute before an update wasn't loaded."""
+
+
+class _Previous:
+    """Attributes of an instance as they were before its flushed update."""
+
+    def __init__(self, instance):
+        self._instance = instance
+        self._attrs = inspect(instance).attrs
+
+    def __getattr__(self, name):
+        if name in self._attrs.keys():
+            history = self._attrs[name].history
+            if history.deleted:
+                return history.deleted[0]
+            if history.added:
+                raise _UnknownPrevious(name)
+        return getattr(self._instance, name)
@@ -1,12 +1,60 @@
 from __future__ import absolute_import
 
+import json
 import math
+import sys
+import time
+from concurrent.futures import wait
+from contextlib import contextmanager
+from itertools import islice
 
-from sqlalchemy import Text, func, or_
-from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy import Text, false, func, null, or_
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
 
-from datatables.clean_regex import clean_regex
-from datatables.search_methods import SEARCH_METHODS
+from datatables.clean_regex import clean_regex, literal_alternatives
+from datatables.coordination import DrawSuperseded
+from datatables.core import CoreQuery
+from datatables.delta import WINDOW_PARAM, client_state, format_watermark, window_token
+from datatables.dialects import statement_timeout
+from datatables.joins import prune_joins
+from datatables.predicates import contains, starts_with
+from datatables.related import exists_related
+from datatables.spec import DataTablesSpec, column_flag
+from datatables.versioning import etag_matches, make_etag
+
+# output keys of the statements of a draw
+PHASE_OUTPUT_KEYS = {
+    "cardinality": "recordsTotal",
+    "cardinality_filtered": "recordsFiltered",
+}
+
+
+# kinds of statements which can be routed to another bind
+ROUTED_PHASES = ["total_count", "filtered_count", "facets", "page"]
+
+# what to do with a page over max_length, max_rows or max_bytes
+LIMIT_ACTIONS = ["truncate", "reject", "stream"]
+
+# label of the facet option counting the rows of the values over facet_limit
+FACET_OTHER_LABEL = "Other"
+
+# label of the facet option of the NULL values
+FACET_NULL_LABEL = "(empty)"
+
+# rows fetched at once when building or streaming a limited page
+CHUNK_SIZE = 1000
+
+PHASE_KINDS = {
+    "cardinality": "total_count",
+    "cardinality_filtered": "filtered_count",
+    "results": "page",
+}
+
+
+class _Degraded:
+    """Result of a statement which ran out of time budget."""
 
 
 class DataTables:
@@ -15,23 +63,181 @@ class DataTables:
     :param request: request containing the GET values, specified by the
         datatable for filtering, sorting and paging
     :type request: pyramid.request
-    :param query: the query wanted to be seen in the the table
-    :type query: sqlalchemy.orm.query.Query
+    :param query: the query wanted to be seen in the the table, an ORM query
+        or a Core select run on `connection`
+    :type query: sqlalchemy.orm.query.Query or sqlalchemy.sql.Select
     :param columns: columns specification for the datatables
     :type columns: list
+    :param executor: executor used to run the independent statements of a
+        draw (counts, yadcf data and page) concurrently, each one on its own
+        session or connection bound to the engine of the query (default None,
+        statements are run one after another on the session of the query)
+    :type executor: concurrent.futures.Executor
+    :param tracked_count: count of the base query maintained from ORM events,
+        used instead of counting the rows on each draw (default None)
+    :type tracked_count: datatables.counts.TrackedCount
+    :param coordinator: coordinator cancelling the draw when a newer draw
+        starts for the same `coordination_key` (default None)
+    :type coordinator: datatables.coordination.DrawCoordinator
+    :param coordination_key: hashable identifying the page instance and the
+        table of the draw, required with a coordinator
+    :param time_budget: deadline in seconds for the whole draw, enforced with
+        statement timeouts. The page is fetched first, then a filtered count
+        running out of time is estimated from the page, a total count is the
+        last known tracked count or unknown (null), and yadcf data is skipped
+        (default None)
+    :type time_budget: float
+    :param spec: precompiled spec of the query and columns (default None,
+        compiled for this request)
+    :type spec: datatables.spec.DataTablesSpec
+    :param lazy: don't run the statements on initialization, but when their
+        data is requested with `page()`, `counts()`, `yadcf_data()` or
+        `output_result()` (default False)
+    :type lazy: bool
+    :param connection: connection or engine running a Core select query
+        (default None)
+    :type connection: sqlalchemy.engine.Connection or sqlalchemy.engine.Engine
+    :param routing: engines to run some kinds of statements on instead of
+        the session of the query, such as read replicas for the counts and
+        yadcf data, as a dict or a callable taking the kind and returning an
+        engine or None. Kinds are 'total_count', 'filtered_count', 'facets'
+        and 'page' (default None)
+    :type routing: dict or callable
+    :param max_length: maximum length of a page, a length of -1 (all the
+        rows) being over it (default None)
+    :type max_length: int
+    :param max_rows: maximum number of rows materialized (default None)
+    :type max_rows: int
+    :param max_bytes: approximate budget in bytes of the materialized rows,
+        tracked while building them (default None)
+    :type max_bytes: int
+    :param on_limit: what to do with a page over one of the limits:
+        'truncate' it at the limit and set `truncated`, 'reject' the request
+        with an error, or 'stream' it, setting `streaming` and leaving the
+        rows to `iter_output()` (default 'truncate')
+    :type on_limit: str
+    :param autocomplete_limit: only send the first values starting with the
+        typed search value of `yadcf_autocomplete` columns, at most this
+        many, instead of all their distinct values (default None)
+    :type autocomplete_limit: int
+    :param autocomplete_by_frequency: send the most frequent values first,
+        instead of the values in order, with `autocomplete_limit`
+        (default False)
+    :type autocomplete_by_frequency: bool
+    :param facet_limit: send the options of `yadcf_select` and
+        `yadcf_multi_select` columns as facets, `{"value", "label", "count"}`
+        objects of the most frequent values, at most this many, followed by
+        an "Other" option, marked with `"other": true`, counting the rows of
+        the other values. NULL values are labelled "(empty)". -1 sends all
+        the values with their counts (default None, all the distinct values
+        without counts)
+    :type facet_limit: int
+    :param data_version: callable taking the base query and returning a
+        cheap token changing with its data, such as
+        `datatables.versioning.max_version(User.updated_at)` or a
+        `datatables.versioning.ChangeCounter`, used by `etag()`
+        (default None)
+    :type data_version: callable
+    :param key_column: name (mData) of the column of the row keys, required
+        with `version_column` (default None)
+    :type key_column: str
+    :param version_column: name (mData) of a column increasing on every
+        change of a row, such as `updated_at`, enabling delta draws: given
+        the watermark, window and keys of the previous response, only the
+        rows of the page changed since are sent, with the keys removed from
+        it. A full page is sent when the filters, sorts or paging changed
+        (default None)
+    :type version_column: str
 
     :returns: a DataTables object
     """
 
-    def __init__(self, request, query, columns, allow_regex_searches=False):
+    def __init__(
+        self,
+        request,
+        query,
+        columns,
+        allow_regex_searches=False,
+        executor=None,
+        tracked_count=None,
+        coordinator=None,
+        coordination_key=None,
+        time_budget=None,
+        spec=None,
+        lazy=False,
+        connection=None,
+        routing=None,
+        max_length=None,
+        max_rows=None,
+        max_bytes=None,
+        on_limit="truncate",
+        autocomplete_limit=None,
+        autocomplete_by_frequency=False,
+        facet_limit=None,
+        data_version=None,
+        key_column=None,
+        version_column=None,
+    ):
         """Initialize object and run the query."""
         self.params = dict(request)
         if "sEcho" in self.params:
             raise ValueError("Legacy datatables not supported, upgrade to >=1.10")
+        if isinstance(query, Select):
+            if connection is None:
+                raise ValueError("A connection is required with a select query")
+            query = CoreQuery(query, connection)
         self.query = query
         self.columns = columns
+        if isinstance(routing, dict):
+            for kind in routing:
+                if kind not in ROUTED_PHASES:
+                    raise ValueError("{} is not an allowed routing kind.".format(kind))
+        self.routing = routing
+        if spec is None:
+            spec = DataTablesSpec(query, columns, allow_regex_searches)
+        self.spec = spec
         self.results = None
         self.allow_regex_searches = allow_regex_searches
+        self.executor = executor
+        self.tracked_count = tracked_count
+        if coordinator is not None and coordination_key is None:
+            raise ValueError("A coordination_key is required with a coordinator")
+        self.coordinator = coordinator
+        self.coordination_key = coordination_key
+        self._token = None
+        self.time_budget = time_budget
+        self._deadline = None
+        if on_limit not in LIMIT_ACTIONS:
+            raise ValueError(
+                "{} is not an allowed value for on_limit.".format(on_limit)
+            )
+        self.max_length = max_length
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.on_limit = on_limit
+        self.autocomplete_limit = autocomplete_limit
+        self.autocomplete_by_frequency = autocomplete_by_frequency
+        self.facet_limit = facet_limit
+        self.data_version = data_version
+        self._etag = None
+        self._delta_columns = None
+        if version_column is not None:
+            self._delta_columns = self._delta_column_indexes(key_column, version_column)
+            if max_rows is not None or max_bytes is not None:
+                raise ValueError("max_rows and max_bytes don't apply to delta draws")
+
+        # keys, removed keys and watermark of a delta draw
+        self.delta = None
+
+        # the page was cut at a limit, or is left to iter_output()
+        self.truncated = False
+        self.streaming = False
+
+        # approximate size in bytes of the materialized rows
+        self.materialized_bytes = 0
+
+        # output keys of the statements which ran out of time budget
+        self.degraded = []
 
         # total in the table after filtering
         self.cardinality_filtered = 0
@@ -41,27 +247,124 @@ class DataTables:
 
         self.yadcf_params = []
         self.filter_expressions = []
+        self.sort_expressions = []
         self.error = None
+
+        # a newer draw started for the same coordination key
+        self.superseded = False
+
+        # names of the statements already run
+        self._fetched = set()
+        self._prepared = False
+        if not lazy:
+            self._run_safely()
+
+    def _run_safely(self):
         try:
             self.run()
+        except DrawSuperseded:
+            self.superseded = True
         except Exception as exc:
             self.error = str(exc)
 
+    def page(self):
+        """Return the rows of the page, fetching them if needed."""
+        self._prepare()
+        self._fetch([("results", self._results_phase())])
+        return self.results
+
+    def counts(self):
+        """Return the total and filtered counts, counting them if needed."""
+        self._prepare()
+        self._fetch(
+            [
+                ("cardinality", self._count_phase),
+                ("cardinality_filtered", self._count_filtered_phase),
+            ]
+        )
+        return self.cardinality, self.cardinality_filtered
+
+    def yadcf_data(self):
+        """Return the values of the yadcf filters, querying them if needed."""
+        self._prepare()
+        self._fetch(self._yadcf_phases())
+        return dict(self.yadcf_params)
+
+    def etag(self):
+        """Return the ETag of the response, from the request and data version.
+
+        Only the data version is read, so that a lazy DataTables can answer
+        "not modified" without running the statements of the draw.
+        """
+        if self.data_version is None:
+            raise ValueError("A data_version is required for ETags")
+        if self._etag is None:
+            self._etag = make_etag(self.params, self.data_version(self.query))
+        return self._etag
+
+    def not_modified(self, if_none_match):
+        """Return True when the client's ETag matches the current one.
+
+        :param if_none_match: value of the If-None-Match header, or None
+        """
+        return etag_matches(self.etag(), if_none_match)
+
     def output_result(self):
         """Output results in the format needed by DataTables."""
+        if self.error is None and not self.superseded:
+            # run the statements not run yet by a lazy DataTables
+            self._run_safely()
         output = {}
         output["draw"] = str(int(self.params.get("draw", 1)))
-        output["recordsTotal"] = str(self.cardinality)
+        output["recordsTotal"] = (
+            str(self.cardinality) if self.cardinality is not None else None
+        )
         output["recordsFiltered"] = str(self.cardinality_filtered)
+        if self.superseded:
+            # discarded by the client, which already sent a newer draw
+            output["data"] = []
+            return output
         if self.error:
             output["error"] = self.error
             return output
 
-        output["data"] = self.results
+        output["data"] = self.results if not self.streaming else []
         for k, v in self.yadcf_params:
             output[k] = v
+        if self.degraded:
+            output["degraded"] = self.degraded
+        if self.truncated:
+            output["truncated"] = True
+        if self.delta is not None:
+            output["delta"] = self.delta
         return output
 
+    def iter_output(self, chunk_size=CHUNK_SIZE):
+        """Output results as JSON text chunks, streaming a page too large.
+
+        A page over the limits with `on_limit='stream'` is fetched again,
+        `chunk_size` rows at a time, while it is written, instead of being
+        materialized. Values which aren't JSON types are output as strings.
+
+        :param chunk_size: number of rows fetched and written at once
+        :type chunk_size: int
+        :returns: iterator of str
+        """
+        output = self.output_result()
+        if not self.streaming or "error" in output:
+            yield json.dumps(output, default=str)
+            return
+
+        del output["data"]
+        yield json.dumps(output, default=str)[:-1] + ', "data": ['
+        separator = ""
+        for chunk in self._iter_chunks(self._paged_query(self.query), chunk_size):
+            text = ", ".join(json.dumps(row, default=str) for row in chunk)
+            if text:
+                yield separator + text
+                separator = ", "
+        yield "]}"
+
     def _query_with_all_filters_except_one(self, query, exclude):
         return query.filter(
             *[
@@ -71,69 +374,487 @@ class DataTables:
             ]
         )
 
-    def _set_yadcf_data(self, query):
-        # determine values for yadcf filters
+    def _yadcf_phases(self):
+        """Return the statements determining values for yadcf filters."""
+        phases = []
         for i, col in enumerate(self.columns):
+            name = "yadcf_data_{:d}".format(i)
             if col.search_method in "yadcf_range_number_slider":
-                v = query.add_columns(
-                    func.min(col.sqla_expr), func.max(col.sqla_expr)
-                ).one()
-                self.yadcf_params.append(
-                    ("yadcf_data_{:d}".format(i), (math.floor(v[0]), math.ceil(v[1])))
-                )
-            if col.search_method in [
+                phases.append((name, self._yadcf_range_phase(col)))
+            if (
+                col.search_method == "yadcf_autocomplete"
+                and self.autocomplete_limit is not None
+            ):
+                phases.append((name, self._yadcf_autocomplete_phase(i, col)))
+            elif (
+                col.search_method in ["yadcf_select", "yadcf_multi_select"]
+                and self.facet_limit is not None
+            ):
+                phases.append((name, self._yadcf_facet_phase(i, col)))
+            elif col.search_method in [
                 "yadcf_select",
                 "yadcf_multi_select",
                 "yadcf_autocomplete",
             ]:
-                filtered = self._query_with_all_filters_except_one(
-                    query=query, exclude=i
-                )
-                v = filtered.add_columns(col.sqla_expr).distinct().all()
-                self.yadcf_params.append(
-                    ("yadcf_data_{:d}".format(i), [r[0] for r in v])
+                phases.append((name, self._yadcf_distinct_phase(i, col)))
+        return phases
+
+    def _yadcf_range_phase(self, col):
+        def phase(query):
+            if col.related is not None:
+                query = query.join(col.related)
+            v = query.add_columns(
+                func.min(col.sqla_expr), func.max(col.sqla_expr)
+            ).one()
+            if v[0] is None:
+                # no rows, or only NULLs
+                return (None, None)
+            return (math.floor(v[0]), math.ceil(v[1]))
+
+        return phase
+
+    def _yadcf_distinct_phase(self, i, col):
+        def phase(query):
+            filtered = self._query_with_all_filters_except_one(query=query, exclude=i)
+            if col.related is not None:
+                filtered = filtered.join(col.related)
+            v = filtered.add_columns(col.sqla_expr).distinct().all()
+            return [r[0] for r in v]
+
+        return phase
+
+    def _yadcf_autocomplete_phase(self, i, col):
+        prefix = self.params.get("columns[{:d}][search][value]".format(i), "")
+
+        def phase(query):
+            filtered = self._query_with_all_filters_except_one(query=query, exclude=i)
+            if col.related is not None:
+                filtered = filtered.join(col.related)
+            if prefix:
+                filtered = filtered.filter(starts_with(col.sqla_expr, prefix))
+            filtered = filtered.add_columns(col.sqla_expr)
+            if self.autocomplete_by_frequency:
+                filtered = filtered.group_by(col.sqla_expr).order_by(
+                    func.count().desc(), col.sqla_expr
                 )
+            else:
+                filtered = filtered.distinct().order_by(col.sqla_expr)
+            v = filtered.limit(self.autocomplete_limit).all()
+            return [r[0] for r in v]
+
+        return phase
+
+    def _yadcf_facet_phase(self, i, col):
+        def phase(query):
+            filtered = self._query_with_all_filters_except_one(query=query, exclude=i)
+            if col.related is not None:
+                filtered = filtered.join(col.related)
+            count = func.count()
+            # the window sums the counts of all the groups, before the limit
+            filtered = (
+                filtered.add_columns(col.sqla_expr, count, func.sum(count).over())
+                .group_by(col.sqla_expr)
+                .order_by(count.desc(), col.sqla_expr)
+            )
+            if self.facet_limit >= 0:
+                # at least one row, which carries the total of the window
+                filtered = filtered.limit(max(self.facet_limit, 1))
+            v = filtered.all()
+            total = int(v[0][2]) if v else 0
+            if self.facet_limit >= 0:
+                v = v[: self.facet_limit]
+            facets = [make_facet(r[0], r[1]) for r in v]
+            other = total - sum(r[1] for r in v)
+            if other:
+                facets.append(make_other_facet(other))
+            return facets
+
+        return phase
+
+    def _count_phase(self, query):
+        """Count the rows of the base query."""
+        if self.tracked_count is not None:
+            return self.tracked_count.get(lambda: self._counted(query).count())
+        return self._counted(query).count()
+
+    def _count_filtered_phase(self, query):
+        """Count the rows of the base query once filtered."""
+        query = query.filter(*[e for e in self.filter_expressions if e is not None])
+        return self._counted(query).count()
 
-    def run(self):
-        """Launch filtering, sorting and paging to output results."""
-        query = self.query
+    def _counted(self, query):
+        """Return the query of a count, without the joins it doesn't need.
 
-        # count before filtering
-        self.cardinality = query.add_columns(self.columns[0].sqla_expr).count()
+        Joins which neither the filters nor the first column reference, and
+        which can't change the number of rows, such as joins to one row
+        only made to show its columns, are pruned. The count keeps every
+        join when they can't be analyzed.
+        """
+        column = self.spec.expressions[0]
+        return prune_joins(query, [column]).add_columns(column)
 
-        self._set_column_filter_expressions()
-        self._set_global_filter_expression()
-        self._set_sort_expressions()
-        self._set_yadcf_data(query)
+    def rows_query(self, query=None):
+        """Return the query of the filtered and sorted rows, without paging.
+
+        :param query: base query (default None, the query of the DataTables)
+        """
+        self._prepare()
+        if query is None:
+            query = self.query
+
+        # add columns to query, formatted in SQL when supported, and NULL
+        # for the columns hidden by the client
+        expressions = [
+            expr if column_flag(self.params, i, "visible") else null()
+            for i, expr in enumerate(self.spec.projection(self._dialect())[0])
+        ]
+        return self._sorted_query(query, expressions).add_columns(*expressions)
+
+    def _sorted_query(self, query, expressions):
+        """Return the query filtered and sorted, without columns.
+
+        The joins which aren't needed by the filters, the sorts and the
+        expressions selected, and can't change the rows, are pruned.
+        """
+        used = [
+            e for e in self.filter_expressions + self.sort_expressions if e is not None
+        ]
+        query = prune_joins(query, used + list(expressions))
 
         # apply filters
         query = query.filter(*[e for e in self.filter_expressions if e is not None])
 
-        self.cardinality_filtered = query.add_columns(self.columns[0].sqla_expr).count()
-
         # apply sorts
-        query = query.order_by(*[e for e in self.sort_expressions if e is not None])
-
-        # add paging options
-        length = int(self.params.get("length"))
-        if length >= 0:
-            query = query.limit(length)
-        elif length == -1:
-            pass
-        else:
-            raise (ValueError("Length should be a positive integer or -1 to disable"))
-        query = query.offset(int(self.params.get("start")))
+        return query.order_by(*[e for e in self.sort_expressions if e is not None])
+
+    def format_rows(self, rows):
+        """Apply the formatters not compiled to SQL to fetched rows.
 
-        # add columns to query
-        query = query.add_columns(*[c.sqla_expr for c in self.columns])
+        Each formatter formats all the values of its column at once.
 
-        # fetch the result of the queries
-        column_names = [
-            col.mData if col.mData else str(i) for i, col in enumerate(self.columns)
+        :param rows: rows fetched from `rows_query()`
+        :returns: the formatted rows
+        """
+        formatters = self.spec.projection(self._dialect())[1]
+        if not formatters or not rows:
+            return rows
+        values = [list(column) for column in zip(*rows)]
+        for i, formatter in formatters:
+            values[i] = formatter.format(values[i])
+        return list(zip(*values))
+
+    def _paged_query(self, query):
+        """Return the query of the filtered, sorted and paged rows."""
+        return self._with_paging(self.rows_query(query))
+
+    def _with_paging(self, query):
+        """Return a query limited to the requested page."""
+        if self.length >= 0:
+            query = query.limit(self.length)
+        return query.offset(self.start)
+
+    def _iter_chunks(self, query, chunk_size):
+        """Fetch rows from a server-side cursor and yield them as dicts."""
+        rows = iter(query.yield_per(chunk_size))
+        while True:
+            chunk = self.format_rows(list(islice(rows, chunk_size)))
+            if not chunk:
+                return
+            yield self._make_rows(chunk)
+
+    def _make_rows(self, rows):
+        """Return formatted rows as dicts keyed by column name."""
+        column_names = self.spec.column_names
+        return [{k: v for k, v in zip(column_names, row)} for row in rows]
+
+    def _page_phase(self, query):
+        """Fetch the filtered, sorted and paged rows."""
+        if self.streaming:
+            return None
+        query = self._paged_query(query)
+        if self.max_rows is None and self.max_bytes is None:
+            # fetch the result of the queries
+            results = self._make_rows(self.format_rows(query.all()))
+            self.materialized_bytes = sum(_approximate_size(r) for r in results)
+            return results
+
+        if self.max_rows is not None:
+            # one more row tells if the page is over the limit
+            limit = self.max_rows + 1
+            query = query.limit(min(limit, self.length) if self.length >= 0 else limit)
+        results = []
+        size = 0
+        for chunk in self._iter_chunks(query, CHUNK_SIZE):
+            for row in chunk:
+                row_size = _approximate_size(row)
+                if self.max_rows is not None and len(results) >= self.max_rows:
+                    self._over_limit("{} rows".format(self.max_rows))
+                elif self.max_bytes is not None and size + row_size > self.max_bytes:
+                    self._over_limit("{} bytes".format(self.max_bytes))
+                else:
+                    results.append(row)
+                    size += row_size
+                    continue
+                self.materialized_bytes = size
+                return None if self.streaming else results
+        self.materialized_bytes = size
+        return results
+
+    def _results_phase(self):
+        """Return the statement of the rows, a delta with a version column."""
+        return self._page_phase if self._delta_columns is None else self._delta_phase
+
+    def _delta_column_indexes(self, key_column, version_column):
+        """Return the indexes of the key and version columns."""
+        if key_column is None:
+            raise ValueError("A key_column is required with a version_column")
+        indexes = []
+        for name in [key_column, version_column]:
+            if name not in self.spec.column_names:
+                raise ValueError("{} is not a column name.".format(name))
+            i = self.spec.column_names.index(name)
+            if self.columns[i].related is not None:
+                raise ValueError("{} is a related column.".format(name))
+            indexes.append(i)
+        return indexes
+
+    def _delta_phase(self, query):
+        """Fetch the rows of the page changed since the previous response.
+
+        The keys and versions of the page are selected first, then only the
+        rows which are new to the client or changed since its watermark.
+        """
+        key_index, version_index = self._delta_columns
+        key_expr = self.columns[key_index].sqla_expr
+        version_expr = self.columns[version_index].sqla_expr
+        window = window_token(self.params)
+        state = None
+        if self.params.get(WINDOW_PARAM) == window:
+            state = client_state(self.params, version_expr.type)
+
+        keyed = self._sorted_query(query, [key_expr, version_expr])
+        keyed = keyed.add_columns(key_expr, version_expr)
+        versions = [tuple(row) for row in self._with_paging(keyed).all()]
+        watermark = max((v for _, v in versions if v is not None), default=None)
+        if state is None:
+            changed = [key for key, _ in versions]
+            removed = None
+        else:
+            client_watermark, client_keys = state
+            known_keys = {str(k) for k in client_keys}
+            changed = [
+                key
+                for key, version in versions
+                if str(key) not in known_keys
+                or version is not None
+                and version > client_watermark
+            ]
+            page_keys = {str(key) for key, _ in versions}
+            removed = [k for k in client_keys if str(k) not in page_keys]
+            if watermark is None or watermark < client_watermark:
+                watermark = client_watermark
+
+        self.delta = {
+            "full": state is None,
+            "window": window,
+            "watermark": None if watermark is None else format_watermark(watermark),
+            "keys": [key for key, _ in versions],
+        }
+        if removed is not None:
+            self.delta["removed"] = removed
+        if not changed:
+            return []
+
+        # fetch the changed rows by key, in the order of the page
+        rows_query = self.rows_query(query).filter(key_expr.in_(changed))
+        rows = rows_query.add_columns(key_expr).all()
+        names = self.spec.column_names
+        by_key = {
+            row[-1]: dict(zip(names, shown))
+            for row, shown in zip(rows, self.format_rows([r[:-1] for r in rows]))
+        }
+        results = [by_key[key] for key in changed if key in by_key]
+        self.materialized_bytes = sum(_approximate_size(r) for r in results)
+        return results
+
+    def _over_limit(self, limit):
+        """Reject, stream or truncate a page over a limit, per on_limit."""
+        if self.on_limit == "reject":
+            raise ValueError("The page is over the limit of {}".format(limit))
+        if self.on_limit == "stream":
+            self.streaming = True
+        else:
+            self.truncated = True
+
+    def _set_paging(self):
+        """Validate the paging options."""
+        self.length = int(self.params.get("length"))
+        if self.length < -1:
+            raise (ValueError("Length should be a positive integer or -1 to disable"))
+        if self.max_length is not None and not 0 <= self.length <= self.max_length:
+            self._over_limit("a length of {}".format(self.max_length))
+            if self.truncated:
+                self.length = self.max_length
+        self.start = int(self.params.get("start"))
+
+    def _route(self, name):
+        """Return the engine a statement is routed to, None if not routed."""
+        if self.routing is None:
+            return None
+        kind = PHASE_KINDS.get(name, "facets")
+        if callable(self.routing):
+            return self.routing(kind)
+        return self.routing.get(kind)
+
+    def _run_in_own_session(self, phase, bind=None):
+        """Run a statement on its own session bound to the query engine."""
+        if isinstance(self.query, CoreQuery):
+            with (bind or self.query.engine).connect() as connection:
+                return phase(self.query.with_bind(connection))
+
+        session = Session(bind=bind or self.query.session.get_bind())
+        try:
+            return phase(self.query.with_session(session))
+        finally:
+            session.close()
+
+    @contextmanager
+    def _draw_query(self):
+        """Yield the query running the statements of the draw in sequence."""
+        if isinstance(self.query, CoreQuery):
+            with self.query.connect() as connection:
+                yield self.query.with_bind(connection)
+        else:
+            yield self.query
+
+    def _guarded(self, phase):
+        """Skip or cancel a statement once the draw is superseded."""
+        token = self._token
+        if token is None:
+            return phase
+
+        def guarded(query):
+            token.check()
+            with token.watch(_connection_of(query)):
+                return phase(query)
+
+        return guarded
+
+    def _budgeted(self, name, phase):
+        """Run a statement in the time left, degrading it once run out."""
+        if self._deadline is None:
+            return phase
+
+        def budgeted(query):
+            remaining = self._deadline - time.monotonic()
+            if remaining > 0:
+                try:
+                    with statement_timeout(_connection_of(query), remaining):
+                        return phase(query)
+                except DBAPIError:
+                    if time.monotonic() < self._deadline:
+                        raise
+            if name == "results":
+                raise ValueError("Time budget of {}s exceeded".format(self.time_budget))
+            return _Degraded
+
+        return budgeted
+
+    def _run_phases(self, phases):
+        """Run the statements of a draw and gather their results in order.
+
+        Without an executor the statements are run one after another on the
+        session of the query, otherwise they are all submitted at once and
+        the first error, in the order of the statements, is raised. Routed
+        statements run on their own session bound to their engine.
+        """
+        phases = [
+            (name, self._guarded(self._budgeted(name, phase)), self._route(name))
+            for name, phase in phases
+        ]
+        if self.executor is None:
+            results = []
+            with self._draw_query() as query:
+                for name, phase, bind in phases:
+                    if bind is None:
+                        results.append((name, phase(query)))
+                    else:
+                        results.append((name, self._run_in_own_session(phase, bind)))
+            return results
+
+        futures = [
+            (name, self.executor.submit(self._run_in_own_session, phase, bind))
+            for name, phase, bind in phases
         ]
-        self.results = [
-            {k: v for k, v in zip(column_names, row)} for row in query.all()
+        wait([future for _, future in futures])
+        return [(name, future.result()) for name, future in futures]
+
+    def run(self):
+        """Launch filtering, sorting and paging to output results."""
+        self._prepare()
+        phases = [
+            ("cardinality", self._count_phase),
+            ("cardinality_filtered", self._count_filtered_phase),
         ]
+        phases.extend(self._yadcf_phases())
+        if self.time_budget is None:
+            phases.append(("results", self._results_phase()))
+        else:
+            # the page is the one statement which can't be degraded
+            phases.insert(0, ("results", self._results_phase()))
+        self._fetch(phases)
+
+    def _prepare(self):
+        """Build the filter and sort expressions of the request once."""
+        if self._prepared:
+            return
+        self._set_column_filter_expressions()
+        self._set_global_filter_expression()
+        self._set_sort_expressions()
+        self._set_paging()
+        if self.time_budget is not None:
+            self._deadline = time.monotonic() + self.time_budget
+        self._prepared = True
+
+    def _fetch(self, phases):
+        """Run the statements not run yet and store their results."""
+        phases = [(name, phase) for name, phase in phases if name not in self._fetched]
+        if not phases:
+            return
+
+        if self.coordinator is not None:
+            self._token = self.coordinator.begin(
+                self.coordination_key, int(self.params.get("draw", 1))
+            )
+        try:
+            results = self._run_phases(phases)
+        finally:
+            if self._token is not None:
+                self.coordinator.end(self._token)
+
+        for name, value in results:
+            self._fetched.add(name)
+            if value is _Degraded:
+                self.degraded.append(PHASE_OUTPUT_KEYS.get(name, name))
+            elif name.startswith("yadcf_data_"):
+                self.yadcf_params.append((name, value))
+            else:
+                setattr(self, name, value)
+
+        # estimate the counts which ran out of time from the page
+        if self.results is None:
+            return
+        # a delta page only holds the changed rows, but all the keys
+        rows = len(self.delta["keys"]) if self.delta is not None else len(self.results)
+        if "recordsFiltered" in self.degraded:
+            self.cardinality_filtered = self.start + rows
+            if rows == self.length:
+                self.cardinality_filtered += 1
+        if "recordsTotal" in self.degraded:
+            # the filtered estimate says nothing of the total
+            self.cardinality = None
+            if self.tracked_count is not None:
+                self.cardinality = self.tracked_count.last_known
 
     def _set_column_filter_expressions(self):
         """Construct the query: filtering.
@@ -145,8 +866,10 @@ class DataTables:
             filter_expr = None
             value = self.params.get("columns[{:d}][search][value]".format(i), "")
             if value:
-                search_func = SEARCH_METHODS[self.columns[i].search_method]
+                search_func = self.spec.search_functions[i]
                 filter_expr = search_func(self.columns[i].sqla_expr, value)
+                if self.columns[i].related is not None:
+                    filter_expr = exists_related(self.columns[i].related, filter_expr)
             self.filter_expressions.append(filter_expr)
 
     def _set_global_filter_expression(self):
@@ -156,11 +879,12 @@ class DataTables:
             return
 
         if self.allow_regex_searches and self.params.get("search[regex]") == "true":
-            op = self._get_regex_operator()
-            val = clean_regex(global_search)
+            # what's left of the regex is a list of literal alternatives,
+            # searched with LIKE on every dialect instead of a regex operator
+            alternatives = literal_alternatives(clean_regex(global_search))
 
             def filter_for(col):
-                return col.sqla_expr.op(op)(val)
+                return or_(*[contains(col.sqla_expr, a) for a in alternatives])
 
         else:
             val = "%" + global_search + "%"
@@ -168,7 +892,20 @@ class DataTables:
             def filter_for(col):
                 return col.sqla_expr.cast(Text).ilike(val)
 
-        global_filter = [filter_for(col) for col in self.columns if col.global_search]
+        # the columns searchable both in the spec and for the client
+        global_filter = [
+            (
+                exists_related(col.related, filter_for(col))
+                if col.related is not None
+                else filter_for(col)
+            )
+            for i, col in enumerate(self.columns)
+            if col.global_search and column_flag(self.params, i, "searchable")
+        ]
+        if not global_filter:
+            # a search in no column matches no row
+            self.filter_expressions.append(false())
+            return
 
         self.filter_expressions.append(or_(*global_filter))
 
@@ -181,9 +918,12 @@ class DataTables:
         i = 0
         while self.params.get("order[{:d}][column]".format(i), False):
             column_nr = int(self.params.get("order[{:d}][column]".format(i)))
-            column = self.columns[column_nr]
             direction = self.params.get("order[{:d}][dir]".format(i))
-            sort_expr = column.sqla_expr
+            i += 1
+            if not column_flag(self.params, column_nr, "orderable"):
+                continue
+            column = self.columns[column_nr]
+            sort_expr = self.spec.expressions[column_nr]
             if direction == "asc":
                 sort_expr = sort_expr.asc()
             elif direction == "desc":
@@ -199,17 +939,32 @@ class DataTables:
                     raise ValueError("Invalid order direction: {}".format(direction))
 
             sort_expressions.append(sort_expr)
-            i += 1
         self.sort_expressions = sort_expressions
 
-    def _get_regex_operator(self):
-        if isinstance(self.query.session.bind.dialect, postgresql.dialect):
-            return "~"
-        elif isinstance(self.query.session.bind.dialect, mysql.dialect):
-            return "REGEXP"
-        elif isinstance(self.query.session.bind.dialect, sqlite.dialect):
-            return "REGEXP"
-        else:
-            raise NotImplementedError(
-                "Regex searches are not implemented for this dialect"
-            )
+    def _dialect(self):
+        if isinstance(self.query, CoreQuery):
+            return self.query.dialect
+        return self.query.session.get_bind().dialect
+
+
+def make_facet(value, count):
+    """Return the facet option of a value, NULL labelled explicitly."""
+    label = FACET_NULL_LABEL if value is None else value
+    return {"value": value, "label": label, "count": count}
+
+
+def make_other_facet(count):
+    """Return the facet option counting the rows of the values left out."""
+    return {"value": None, "label": FACET_OTHER_LABEL, "count": count, "other": True}
+
+
+def _approximate_size(row):
+    """Return the approximate size in bytes of a row and its values."""
+    return sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row.values())
+
+
+def _connection_of(query):
+    """Return the connection running the statements of a query."""
+    if isinstance(query, CoreQuery):
+        return query.bind
+    return query.session.connection()
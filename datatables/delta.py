@@ -0,0 +1,58 @@
+from __future__ import absolute_import
+
+import datetime
+import hashlib
+import json
+
+from datatables.versioning import normalized_params
+
+# request parameters of a delta draw, sent back from the previous response
+WATERMARK_PARAM = "delta[watermark]"
+WINDOW_PARAM = "delta[window]"
+KEYS_PARAM = "delta[keys]"
+
+
+def window_token(params):
+    """Return a token identifying the filters, sorts and page of a request.
+
+    :param params: request containing the GET values
+    :rtype: str
+    """
+    window = [
+        (k, v) for k, v in normalized_params(params) if not k.startswith("delta[")
+    ]
+    return hashlib.sha1(repr(window).encode("utf-8")).hexdigest()
+
+
+def client_state(params, version_type):
+    """Return the watermark and keys the client has, None without a delta.
+
+    :param params: request containing the GET values
+    :param version_type: SQLAlchemy type of the version column
+    :returns: (watermark, list of keys) or None
+    """
+    watermark = params.get(WATERMARK_PARAM)
+    if not watermark:
+        return None
+    keys = json.loads(params.get(KEYS_PARAM) or "[]")
+    if not isinstance(keys, list):
+        raise ValueError("{} should be a JSON array".format(KEYS_PARAM))
+    return parse_watermark(watermark, version_type), keys
+
+
+def parse_watermark(value, version_type):
+    """Return the python value of a watermark of a version column."""
+    try:
+        python_type = version_type.python_type
+    except NotImplementedError:
+        return value
+    if python_type in (datetime.datetime, datetime.date):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+
+def format_watermark(value):
+    """Return the text of a watermark, parsed back by `parse_watermark()`."""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
@@ -0,0 +1,99 @@
+from __future__ import absolute_import
+
+import logging
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+def dbapi_connection(connection):
+    """Return the DBAPI connection behind a SQLAlchemy connection."""
+    fairy = connection.connection
+    return getattr(fairy, "dbapi_connection", None) or fairy.connection
+
+
+def cancel_statement(connection):
+    """Cancel the statement running on a connection, from another thread.
+
+    PostgreSQL drivers send a cancel request, SQLite interrupts the
+    connection and MySQL kills the query from a new connection of the same
+    engine. Any other dialect gets its connection invalidated.
+
+    :param connection: connection running the statement
+    :type connection: sqlalchemy.engine.Connection
+    """
+    raw = dbapi_connection(connection)
+    if connection.dialect.name == "mysql" and hasattr(raw, "thread_id"):
+        with connection.engine.connect() as killer:
+            killer.exec_driver_sql("KILL QUERY {:d}".format(raw.thread_id()))
+    elif hasattr(raw, "cancel"):
+        raw.cancel()
+    elif hasattr(raw, "interrupt"):
+        raw.interrupt()
+    else:
+        connection.invalidate()
+    logger.debug("cancel_statement: cancelled on %s", connection.dialect.name)
+
+
+@contextmanager
+def statement_timeout(connection, seconds):
+    """Limit the duration of the statements run on a connection.
+
+    PostgreSQL sets `statement_timeout` in a savepoint, so that a cancelled
+    statement doesn't abort the transaction, MySQL sets
+    `MAX_EXECUTION_TIME` and SQLite installs a progress handler. Other
+    dialects run the statements without limit.
+
+    :param connection: connection running the statements
+    :param seconds: time left to run the statements
+    :type connection: sqlalchemy.engine.Connection
+    :type seconds: float
+    """
+    name = connection.dialect.name
+    milliseconds = max(int(seconds * 1000), 1)
+    if name == "postgresql":
+        savepoint = connection.begin_nested()
+        previous = connection.exec_driver_sql(
+            "SELECT current_setting('statement_timeout')"
+        ).scalar()
+        try:
+            _set_config(connection, "statement_timeout", str(milliseconds))
+            yield
+            _set_config(connection, "statement_timeout", previous)
+        except Exception:
+            savepoint.rollback()
+            raise
+        savepoint.commit()
+    elif name == "mysql":
+        previous = connection.exec_driver_sql(
+            "SELECT @@SESSION.max_execution_time"
+        ).scalar()
+        connection.exec_driver_sql(
+            "SET SESSION max_execution_time = {:d}".format(milliseconds)
+        )
+        try:
+            yield
+        finally:
+            connection.exec_driver_sql(
+                "SET SESSION max_execution_time = {:d}".format(int(previous))
+            )
+    elif name == "sqlite":
+        raw = dbapi_connection(connection)
+        deadline = time.monotonic() + seconds
+        raw.set_progress_handler(lambda: time.monotonic() >= deadline, 1000)
+        try:
+            yield
+        finally:
+            raw.set_progress_handler(None, 0)
+    else:
+        yield
+
+
+def _set_config(connection, setting, value):
+    connection.execute(
+        text("SELECT set_config(:setting, :value, true)"),
+        {"setting": setting, "value": value},
+    )
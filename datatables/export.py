@@ -0,0 +1,94 @@
+from __future__ import absolute_import
+
+import csv
+import io
+import json
+from itertools import islice
+
+EXPORT_FORMATS = ["csv", "ndjson"]
+
+
+def iter_export(table, fmt="csv", chunk_size=1000, max_rows=None, progress=None):
+    """Stream the filtered and sorted rows of a DataTables as text chunks.
+
+    The rows are read from a server-side cursor, `chunk_size` at a time, and
+    formatted straight from the fetched tuples, so that exports run in
+    constant memory whatever their size. The paging of the request is
+    ignored.
+
+    :param table: DataTables of the request, preferably lazy
+    :param fmt: 'csv' (with a header row) or 'ndjson' (default 'csv')
+    :param chunk_size: number of rows fetched and formatted at once
+    :param max_rows: maximum number of rows exported (default None)
+    :param progress: callable called with the number of rows exported after
+        each chunk (default None)
+
+    :type table: datatables.DataTables
+    :type fmt: str
+    :type chunk_size: int
+    :type max_rows: int
+    :type progress: callable
+
+    :returns: iterator of str
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError("{} is not an allowed export format.".format(fmt))
+    if chunk_size <= 0:
+        raise ValueError("chunk_size should be a positive integer")
+
+    query = table.rows_query()
+    if max_rows is not None:
+        query = query.limit(max_rows)
+    rows = iter(query.yield_per(chunk_size))
+
+    buffer = io.StringIO()
+    names = table.spec.column_names
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        format_rows = writer.writerows
+    else:
+        keys = [json.dumps(name) + ": " for name in names]
+
+        def format_rows(chunk):
+            for row in chunk:
+                values = [json.dumps(v, default=str) for v in row]
+                buffer.write("{" + ", ".join(map("".join, zip(keys, values))) + "}\n")
+
+    count = 0
+    while True:
+        chunk = table.format_rows(list(islice(rows, chunk_size)))
+        format_rows(chunk)
+        if chunk:
+            count += len(chunk)
+            if progress is not None:
+                progress(count)
+        if buffer.tell():
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if not chunk:
+            return
+
+
+def write_export(
+    table, fileobj, fmt="csv", chunk_size=1000, max_rows=None, progress=None
+):
+    """Write the filtered and sorted rows of a DataTables to a text file.
+
+    See `iter_export` for the parameters.
+
+    :param fileobj: text file-like object to write to
+    :returns: the number of rows written
+    :rtype: int
+    """
+    written = [0]
+
+    def count(rows):
+        written[0] = rows
+        if progress is not None:
+            progress(rows)
+
+    for text in iter_export(table, fmt, chunk_size, max_rows, count):
+        fileobj.write(text)
+    return written[0]
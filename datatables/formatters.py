@@ -0,0 +1,148 @@
+from __future__ import absolute_import
+
+import re
+
+from sqlalchemy import Float, Integer, Numeric, cast, func
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+# strftime directives and their to_char (PostgreSQL) and DATE_FORMAT (MySQL)
+# equivalents
+DATE_DIRECTIVES = {
+    "%d": ("DD", "%d"),
+    "%m": ("MM", "%m"),
+    "%Y": ("YYYY", "%Y"),
+    "%y": ("YY", "%y"),
+    "%H": ("HH24", "%H"),
+    "%I": ("HH12", "%h"),
+    "%M": ("MI", "%i"),
+    "%S": ("SS", "%S"),
+    "%j": ("DDD", "%j"),
+    "%%": ("%", "%%"),
+}
+
+# strftime directives of SQLite (3.40) meaning the same as in python
+SQLITE_DATE_DIRECTIVES = ["%d", "%H", "%j", "%m", "%M", "%S", "%w", "%W", "%Y", "%%"]
+
+
+class Formatter:
+    """Format the values of a column for display.
+
+    A formatter compiles to SQL with `sql()` when the dialect supports it,
+    so that the values are formatted by the database, and otherwise formats
+    the fetched values of the column with `format()`, all at once.
+    """
+
+    def sql(self, expr, dialect):
+        """Return the formatted expression, None when not supported.
+
+        :param expr: SQLAlchemy expression of the column
+        :param dialect: dialect the statement is compiled for
+        """
+        return None
+
+    def format(self, values):
+        """Return the formatted values of a column.
+
+        :param values: fetched values of the column
+        :type values: list
+        :rtype: list
+        """
+        raise NotImplementedError
+
+
+class FunctionFormatter(Formatter):
+    """Format each value of a column, except NULLs, with a python function.
+
+    :param function: function called with a value and returning it formatted
+    :type function: callable
+    """
+
+    def __init__(self, function):
+        self.function = function
+
+    def format(self, values):
+        function = self.function
+        return [None if v is None else function(v) for v in values]
+
+
+class DateFormatter(Formatter):
+    """Format dates and datetimes with a strftime format.
+
+    Pushed down as `strftime` on SQLite, `to_char` on PostgreSQL and
+    `DATE_FORMAT` on MySQL, unless the format uses a directive without
+    equivalent in the dialect.
+
+    :param date_format: strftime format, e.g. '%d-%m-%Y'
+    :type date_format: str
+    """
+
+    def __init__(self, date_format):
+        self.date_format = date_format
+
+    def sql(self, expr, dialect):
+        if isinstance(dialect, sqlite.dialect):
+            directives = re.findall(r"%.", self.date_format)
+            if any(d not in SQLITE_DATE_DIRECTIVES for d in directives):
+                return None
+            return func.strftime(self.date_format, expr)
+        if isinstance(dialect, postgresql.dialect):
+            pattern = _translate_date_format(self.date_format, 0, '"{}"')
+            return None if pattern is None else func.to_char(expr, pattern)
+        if isinstance(dialect, mysql.dialect):
+            pattern = _translate_date_format(self.date_format, 1, "{}")
+            return None if pattern is None else func.date_format(expr, pattern)
+        return None
+
+    def format(self, values):
+        date_format = self.date_format
+        return [None if v is None else v.strftime(date_format) for v in values]
+
+
+class RoundFormatter(Formatter):
+    """Round numbers to a number of decimal digits.
+
+    :param digits: number of decimal digits (default 0)
+    :type digits: int
+    """
+
+    def __init__(self, digits=0):
+        self.digits = digits
+
+    def sql(self, expr, dialect):
+        if dialect.name == "postgresql":
+            # PostgreSQL only rounds numeric values to a number of digits
+            if isinstance(expr.type, Float):
+                rounded = func.round(cast(expr, Numeric), self.digits)
+                return cast(rounded, expr.type)
+            if not isinstance(expr.type, (Integer, Numeric)):
+                return None
+        return func.round(expr, self.digits)
+
+    def format(self, values):
+        digits = self.digits
+        return [None if v is None else round(v, digits) for v in values]
+
+
+def as_formatter(formatter):
+    """Return a Formatter, wrapping a python function if needed."""
+    if formatter is None or isinstance(formatter, Formatter):
+        return formatter
+    if callable(formatter):
+        return FunctionFormatter(formatter)
+    raise ValueError("{!r} is not a formatter.".format(formatter))
+
+
+def _translate_date_format(date_format, index, literal):
+    """Translate a strftime format, None when a directive has no equivalent."""
+    parts = []
+    for token in re.split(r"(%.)", date_format):
+        if token.startswith("%") and len(token) == 2:
+            if token not in DATE_DIRECTIVES:
+                return None
+            parts.append(DATE_DIRECTIVES[token][index])
+        elif token:
+            if index == 0 and re.search(r"[A-Za-z]", token):
+                parts.append(literal.format(token))
+            else:
+                parts.append(token.replace("%", "%%") if index else token)
+    return "".join(parts)
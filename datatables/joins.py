@@ -0,0 +1,206 @@
+from __future__ import absolute_import
+
+from sqlalchemy import UniqueConstraint, inspect
+from sqlalchemy.exc import ArgumentError, NoInspectionAvailable, SQLAlchemyError
+from sqlalchemy.sql import FromClause, operators
+from sqlalchemy.sql.elements import BinaryExpression, BooleanClauseList, ColumnClause
+from sqlalchemy.sql.util import find_tables, join_condition
+
+from datatables.core import CoreQuery
+
+
+def prune_joins(query, expressions):
+    """Return the query without the joins which can't change its rows.
+
+    A join is dropped when none of the expressions, the criteria of the
+    query or its other joins reference the joined table, and the join can't
+    change the number of rows: each row matches at most one row of the
+    table, on its primary key or a unique constraint, and at least one
+    unless outer, through a non-null foreign key. The query is returned
+    unchanged when one of its joins can't be analyzed, or when the
+    statement doesn't have the shape this analysis reads from the internals
+    of SQLAlchemy.
+
+    :param query: ORM query or CoreQuery
+    :param expressions: expressions the statement will use, besides the
+        criteria of the query
+    """
+    try:
+        return _prune_joins(query, expressions)
+    except (AttributeError, TypeError, ValueError, SQLAlchemyError):
+        return query
+
+
+def _prune_joins(query, expressions):
+    """Return the pruned query, raising on a statement of unknown shape."""
+    statement = query.statement if isinstance(query, CoreQuery) else query
+    joins = _analyze_joins(statement)
+    if not joins:
+        return query
+
+    referenced = set()
+    for expression in list(expressions) + _criteria(statement):
+        referenced |= _tables(expression)
+    kept = list(joins)
+    # a join can only depend on the joins before it
+    for join in reversed(joins):
+        target, onclause, safe, _ = join
+        others = set(referenced)
+        for other in kept:
+            if other is not join:
+                others |= _tables(other[1])
+        if safe and target not in others:
+            kept.remove(join)
+    if len(kept) == len(joins):
+        return query
+
+    pruned = statement._generate()
+    pruned._setup_joins = tuple(setup for _, _, _, setup in kept)
+    if isinstance(query, CoreQuery):
+        return query._generate(pruned)
+    return pruned
+
+
+def _analyze_joins(statement):
+    """Return (table, onclause, droppable, setup) of each join, None if unknown."""
+    lefts = []
+    for element in list(statement._from_obj) + list(statement._raw_columns):
+        lefts.extend(t for t in _tables(element) if t not in lefts)
+
+    joins = []
+    for setup in statement._setup_joins:
+        target, onclause, from_, flags = setup
+        if from_ is not None:
+            return None
+        resolved = _resolve_join(target, onclause, lefts)
+        if resolved is None:
+            return None
+        target, onclause = resolved
+        safe = not flags.get("full") and _preserves_rows(
+            target, onclause, flags.get("isouter")
+        )
+        joins.append((target, onclause, safe, setup))
+        lefts.append(target)
+    return joins
+
+
+def _resolve_join(target, onclause, lefts):
+    """Return the joined selectable and the ON clause of a join."""
+    if onclause is None and hasattr(target, "property"):
+        # join(User.address)
+        target, onclause = None, target
+    if hasattr(onclause, "property"):
+        prop = onclause.property
+        if (
+            getattr(prop, "secondary", None) is not None
+            or onclause.parent.is_aliased_class
+        ):
+            return None
+        target_table = _selectable(target) if target is not None else prop.target
+        if target_table is not prop.target:
+            return None
+        return target_table, prop.primaryjoin
+
+    target = _selectable(target)
+    if target is None:
+        return None
+    if onclause is not None:
+        return target, onclause
+    # the ON clause inferred from the foreign keys with a single left table
+    conditions = []
+    for left in lefts:
+        try:
+            conditions.append(join_condition(left, target))
+        except ArgumentError:
+            continue
+    if len(conditions) != 1:
+        return None
+    return target, conditions[0]
+
+
+def _selectable(target):
+    """Return the table or alias of a join target, None if unknown."""
+    if isinstance(target, FromClause):
+        return target._deannotate()
+    try:
+        return inspect(target).selectable._deannotate()
+    except (NoInspectionAvailable, AttributeError):
+        return None
+
+
+def _preserves_rows(target, onclause, outer):
+    """Return True when a join matches each row to exactly one target row.
+
+    Outer joins only need at most one match.
+    """
+    pairs = []
+    others = []
+    clauses = (
+        onclause.clauses if isinstance(onclause, BooleanClauseList) else [onclause]
+    )
+    if (
+        isinstance(onclause, BooleanClauseList)
+        and onclause.operator is not operators.and_
+    ):
+        return False
+    for clause in clauses:
+        pair = _equated_columns(clause, target)
+        if pair is None:
+            others.append(clause)
+        else:
+            pairs.append(pair)
+
+    target_columns = {target_column for _, target_column in pairs}
+    unique_keys = [set(target.primary_key)]
+    unique_keys.extend(
+        set(c.columns)
+        for c in getattr(target, "constraints", ())
+        if isinstance(c, UniqueConstraint)
+    )
+    unique_keys.extend({c} for c in target.columns if getattr(c, "unique", False))
+    if not any(key and key <= target_columns for key in unique_keys):
+        return False
+    if outer:
+        return True
+    # an inner join drops the rows without a match
+    return not others and all(
+        not left.nullable
+        and any(fk.column in target_column.base_columns for fk in left.foreign_keys)
+        for left, target_column in pairs
+    )
+
+
+def _equated_columns(clause, target):
+    """Return (left column, target column) of `left = target`, or None."""
+    if not isinstance(clause, BinaryExpression) or clause.operator is not operators.eq:
+        return None
+    left, right = clause.left, clause.right
+    if not isinstance(left, ColumnClause) or not isinstance(right, ColumnClause):
+        return None
+    left, right = left._deannotate(), right._deannotate()
+    if right.table is target and left.table is not target:
+        return left, right
+    if left.table is target and right.table is not target:
+        return right, left
+    return None
+
+
+def _criteria(statement):
+    """Return the criteria of a statement besides its joins."""
+    return (
+        list(statement._raw_columns)
+        + list(statement._where_criteria)
+        + list(statement._order_by_clauses)
+        + list(statement._group_by_clauses)
+        + list(statement._having_criteria)
+    )
+
+
+def _tables(expression):
+    """Return the tables and aliases an expression references."""
+    if hasattr(expression, "__clause_element__"):
+        expression = expression.__clause_element__()
+    return {
+        table._deannotate()
+        for table in find_tables(expression, check_columns=True, include_aliases=True)
+    }
@@ -0,0 +1,475 @@
+from __future__ import absolute_import
+
+import datetime
+import decimal
+import math
+import operator
+import re
+import threading
+import time
+
+from sqlalchemy import Text
+from sqlalchemy.sql import ClauseElement, Select
+
+from datatables.clean_regex import clean_regex
+from datatables.core import CoreQuery
+from datatables.predicates import InValues, python_type_of
+from datatables.spec import DataTablesSpec, column_flag
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+class NumpyTable:
+    """Answer DataTables requests from columns loaded in memory.
+
+    The values of the columns of the base query are loaded once into typed
+    NumPy arrays, strings being dictionary encoded, and the searches, sorts
+    and paging of each request are evaluated with vectorized operations,
+    without any statement. The output is the one of
+    `DataTables.output_result`. Meant for tables of up to a few million rows
+    which are read far more often than they change: the arrays are reloaded
+    after `invalidate()`, or every `reload_every` seconds.
+
+    Searches use the same search methods as the database, on the loaded
+    values: number and date comparisons are exact, string patterns are
+    matched case-insensitively for `ilike` and case-sensitively for `like`,
+    and the text of non-string values, for the global search, is their
+    python string. NULLs sort first in ascending order, as on SQLite and
+    MySQL. Requires numpy.
+
+    :param query: the query wanted to be seen in the the table, or a Core
+        select run on `connection`
+    :type query: sqlalchemy.orm.query.Query or sqlalchemy.sql.Select
+    :param columns: columns specification for the datatables, without
+        `related` columns
+    :type columns: list
+    :param allow_regex_searches: allow regex global searches (default False)
+    :type allow_regex_searches: bool
+    :param connection: connection or engine running a Core select query
+        (default None)
+    :type connection: sqlalchemy.engine.Connection or sqlalchemy.engine.Engine
+    :param reload_every: seconds after which the arrays are reloaded
+        (default None, only after `invalidate()`)
+    :type reload_every: float
+
+    :returns: a NumpyTable object
+
+    Usage::
+
+        users_table = NumpyTable(DBSession.query().select_from(User), columns)
+
+        @view_config(route_name="data", renderer="json")
+        def data(request):
+            return users_table.output_result(request.GET)
+    """
+
+    def __init__(
+        self,
+        query,
+        columns,
+        allow_regex_searches=False,
+        connection=None,
+        reload_every=None,
+    ):
+        """Compile the spec of the table, the arrays being loaded lazily."""
+        if np is None:
+            raise ImportError("NumpyTable requires numpy")
+        if isinstance(query, Select):
+            if connection is None:
+                raise ValueError("A connection is required with a select query")
+            query = CoreQuery(query, connection)
+        self.spec = DataTablesSpec(query, columns, allow_regex_searches)
+        for column in self.spec.columns:
+            if column.related is not None:
+                raise ValueError("Related columns are not supported in memory.")
+        self.query = query
+        self.reload_every = reload_every
+        self._lock = threading.Lock()
+        self._arrays = None
+        self._loaded_at = None
+
+    def invalidate(self):
+        """Reload the arrays on the next request."""
+        self._arrays = None
+
+    def load(self):
+        """Load the values of the columns into arrays.
+
+        :returns: the number of rows loaded
+        """
+        rows = self.query.add_columns(*self.spec.expressions).all()
+        values = list(zip(*rows)) if rows else [()] * len(self.spec.columns)
+        arrays = [
+            _Array.of(column.sqla_expr, list(column_values))
+            for column, column_values in zip(self.spec.columns, values)
+        ]
+        self._arrays = (arrays, len(rows))
+        self._loaded_at = time.monotonic()
+        return len(rows)
+
+    def _current(self):
+        """Return the arrays and the number of rows, loading them if needed."""
+        arrays = self._arrays
+        if arrays is None or (
+            self.reload_every is not None
+            and time.monotonic() - self._loaded_at > self.reload_every
+        ):
+            with self._lock:
+                if self._arrays is None or self._arrays is arrays:
+                    self.load()
+                arrays = self._arrays
+        return arrays
+
+    def output_result(self, request):
+        """Output results in the format needed by DataTables.
+
+        :param request: request containing the GET values, specified by the
+            datatable for filtering, sorting and paging
+        """
+        params = dict(request)
+        if "sEcho" in params:
+            raise ValueError("Legacy datatables not supported, upgrade to >=1.10")
+        arrays, count = self._current()
+        output = {"draw": str(int(params.get("draw", 1)))}
+        try:
+            draw = _Draw(self.spec, params, arrays, count)
+            data = draw.page()
+            yadcf = draw.yadcf_data()
+        except Exception as exc:
+            output["recordsTotal"] = "0"
+            output["recordsFiltered"] = "0"
+            output["error"] = str(exc)
+            return output
+
+        output["recordsTotal"] = str(count)
+        output["recordsFiltered"] = str(int(draw.mask.sum()))
+        output["data"] = data
+        output.update(yadcf)
+        return output
+
+
+class _Draw:
+    """Filters, sorts and pages of a request, evaluated on the arrays."""
+
+    def __init__(self, spec, params, arrays, count):
+        self.spec = spec
+        self.params = params
+        self.arrays = arrays
+        self.count = count
+        self.filters = self._column_filters() + [self._global_filter()]
+        self.mask = self._combine(self.filters)
+
+    def _combine(self, filters):
+        mask = np.ones(self.count, dtype=bool)
+        for f in filters:
+            if f is not None:
+                mask &= f
+        return mask
+
+    def _column_filters(self):
+        filters = []
+        for i, array in enumerate(self.arrays):
+            value = self.params.get("columns[{:d}][search][value]".format(i), "")
+            mask = None
+            if value:
+                mask = _mask(self.spec.search_functions[i](_Expr(array), value))
+            filters.append(mask)
+        return filters
+
+    def _global_filter(self):
+        global_search = self.params.get("search[value]", "")
+        if global_search == "":
+            return None
+
+        regex = self.spec.allow_regex_searches and self.params.get("search[regex]")
+        if regex == "true":
+            pattern = re.compile(clean_regex(global_search))
+        else:
+            pattern = _like_pattern("%" + global_search + "%", re.IGNORECASE)
+        mask = np.zeros(self.count, dtype=bool)
+        for i, column in enumerate(self.spec.columns):
+            if column.global_search and column_flag(self.params, i, "searchable"):
+                mask |= self.arrays[i].text().matches(pattern)
+        return mask
+
+    def _sort_keys(self):
+        """Return the lexsort keys of the sorts, the primary one last."""
+        keys = []
+        i = 0
+        while self.params.get("order[{:d}][column]".format(i), False):
+            column_nr = int(self.params.get("order[{:d}][column]".format(i)))
+            direction = self.params.get("order[{:d}][dir]".format(i))
+            i += 1
+            if not column_flag(self.params, column_nr, "orderable"):
+                continue
+            column = self.spec.columns[column_nr]
+            if direction not in ["asc", "desc"]:
+                raise ValueError("Invalid order direction: {}".format(direction))
+            array = self.arrays[column_nr]
+            nulls_first = (
+                column.nulls_order == "nullsfirst"
+                if column.nulls_order
+                else direction == "asc"
+            )
+            key = array.sort_key()
+            if direction == "desc":
+                key = -key
+            nulls_key = array.nulls if not nulls_first else ~array.nulls
+            keys[:0] = [key, nulls_key]
+        return keys
+
+    def page(self):
+        length = int(self.params.get("length"))
+        if length < -1:
+            raise (ValueError("Length should be a positive integer or -1 to disable"))
+        start = int(self.params.get("start"))
+
+        indexes = np.flatnonzero(self.mask)
+        keys = self._sort_keys()
+        if keys:
+            indexes = indexes[np.lexsort([key[indexes] for key in keys])]
+        indexes = indexes[start:] if length == -1 else indexes[start : start + length]
+
+        values = []
+        for i, (column, array) in enumerate(zip(self.spec.columns, self.arrays)):
+            if not column_flag(self.params, i, "visible"):
+                values.append([None] * len(indexes))
+                continue
+            column_values = array.objects[indexes].tolist()
+            if column.formatter is not None:
+                column_values = column.formatter.format(column_values)
+            values.append(column_values)
+        names = self.spec.column_names
+        return [dict(zip(names, row)) for row in zip(*values)]
+
+    def yadcf_data(self):
+        data = {}
+        for i, (column, array) in enumerate(zip(self.spec.columns, self.arrays)):
+            name = "yadcf_data_{:d}".format(i)
+            if column.search_method in "yadcf_range_number_slider":
+                present = array.objects[~array.nulls]
+                if not len(present):
+                    data[name] = (None, None)
+                else:
+                    data[name] = (math.floor(min(present)), math.ceil(max(present)))
+            if column.search_method in [
+                "yadcf_select",
+                "yadcf_multi_select",
+                "yadcf_autocomplete",
+            ]:
+                filters = self.filters[:i] + self.filters[i + 1 :]
+                data[name] = array.distinct(self._combine(filters))
+        return data
+
+
+def _mask(predicate):
+    """Return the boolean array of a search method predicate."""
+    if isinstance(predicate, InValues):
+        return predicate.in_clause
+    return predicate
+
+
+def _like_pattern(pattern, flags=0, escape=None):
+    """Compile a LIKE pattern to a regex."""
+    parts = []
+    chars = iter(pattern)
+    for char in chars:
+        if char == escape:
+            parts.append(re.escape(next(chars, "")))
+        elif char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return re.compile(r"\A" + "".join(parts) + r"\Z", flags | re.DOTALL)
+
+
+class _Array:
+    """Values of a column: typed array, NULLs mask and the python objects."""
+
+    def __init__(self, type_, objects, nulls, values):
+        self.type = type_
+        self.objects = objects
+        self.nulls = nulls
+        self.values = values
+        self._text = None
+
+    @classmethod
+    def of(cls, expr, values):
+        """Build the array of a column from its loaded values."""
+        objects = np.empty(len(values), dtype=object)
+        objects[:] = values
+        nulls = np.array([v is None for v in values], dtype=bool)
+        present = [v for v in values if v is not None]
+        python_type = python_type_of(expr)
+        if python_type is None and present:
+            python_type = type(present[0])
+        type_ = getattr(expr, "type", None)
+
+        if python_type is not None and issubclass(python_type, datetime.date):
+            unit = "us" if issubclass(python_type, datetime.datetime) else "D"
+            converted = [v if v is not None else "NaT" for v in values]
+            return _DateArray(
+                type_, objects, nulls, np.array(converted, "datetime64[" + unit + "]")
+            )
+        if python_type is not None and issubclass(
+            python_type, (int, float, decimal.Decimal)
+        ):
+            converted = [float(v) if v is not None else np.nan for v in values]
+            return _NumberArray(type_, objects, nulls, np.array(converted, float))
+        return _TextArray.encode(type_, objects, nulls)
+
+    def text(self):
+        """Return the array of the text of the values."""
+        if self._text is None:
+            strings = np.empty(len(self.objects), dtype=object)
+            strings[:] = [None if v is None else str(v) for v in self.objects]
+            self._text = _TextArray.encode(Text(), strings, self.nulls)
+        return self._text
+
+    def _operand(self, value):
+        return value
+
+    def compare(self, op, value):
+        if value is None or isinstance(value, ClauseElement):
+            return np.zeros(len(self.objects), dtype=bool)
+        return op(self.values, self._operand(value)) & ~self.nulls
+
+    def isin(self, values):
+        operands = [self._operand(v) for v in values if v is not None]
+        return np.isin(self.values, np.array(operands)) & ~self.nulls
+
+    def sort_key(self):
+        raise NotImplementedError
+
+    def distinct(self, mask):
+        """Return the distinct values of the rows of a mask, in order."""
+        indexes = np.flatnonzero(mask & ~self.nulls)
+        keys, first = np.unique(self.sort_key()[indexes], return_index=True)
+        values = self.objects[indexes[first]].tolist()
+        if (mask & self.nulls).any():
+            values.insert(0, None)
+        return values
+
+
+class _NumberArray(_Array):
+    def _operand(self, value):
+        return float(value)
+
+    def sort_key(self):
+        return np.where(self.nulls, 0.0, self.values)
+
+
+class _DateArray(_Array):
+    def _operand(self, value):
+        return np.datetime64(value).astype(self.values.dtype)
+
+    def sort_key(self):
+        return np.where(self.nulls, 0, self.values.view("i8"))
+
+
+class _TextArray(_Array):
+    """Dictionary encoded strings: sorted categories and their codes."""
+
+    def __init__(self, type_, objects, nulls, values, categories):
+        super(_TextArray, self).__init__(type_, objects, nulls, values)
+        self.categories = categories
+        self._text = self
+
+    @classmethod
+    def encode(cls, type_, objects, nulls):
+        strings = np.array(
+            [v if isinstance(v, str) else str(v) for v in objects[~nulls]], dtype=str
+        )
+        categories, codes = np.unique(strings, return_inverse=True)
+        values = np.full(len(objects), -1, dtype=np.int64)
+        values[~nulls] = codes
+        return cls(type_, objects, nulls, values, categories)
+
+    def compare(self, op, value):
+        if value is None or isinstance(value, ClauseElement):
+            return np.zeros(len(self.objects), dtype=bool)
+        left = np.searchsorted(self.categories, value, side="left")
+        right = np.searchsorted(self.categories, value, side="right")
+        # compare the codes with the positions of the value in the categories
+        lower, upper = self.values >= left, self.values < right
+        results = {
+            "eq": lower & upper,
+            "ne": ~(lower & upper),
+            "lt": self.values < left,
+            "le": upper,
+            "gt": self.values >= right,
+            "ge": lower,
+        }
+        return results[op.__name__] & ~self.nulls
+
+    def isin(self, values):
+        wanted = set(str(v) for v in values if v is not None)
+        matching = np.array([c in wanted for c in self.categories], dtype=bool)
+        return self._lookup(matching)
+
+    def matches(self, pattern):
+        """Return the rows whose text matches a compiled regex."""
+        matching = np.array(
+            [pattern.search(c) is not None for c in self.categories], dtype=bool
+        )
+        return self._lookup(matching)
+
+    def _lookup(self, matching):
+        if not len(matching):
+            return np.zeros(len(self.objects), dtype=bool)
+        return matching[np.maximum(self.values, 0)] & ~self.nulls
+
+    def sort_key(self):
+        return self.values
+
+
+class _Expr:
+    """Column of the arrays behaving as a SQLAlchemy expression.
+
+    Search methods build their predicates with it, which are evaluated to
+    boolean arrays instead of being compiled to SQL.
+    """
+
+    def __init__(self, array):
+        self.array = array
+        self.type = array.type
+
+    def __eq__(self, other):
+        return self.array.compare(operator.eq, other)
+
+    def __ne__(self, other):
+        return self.array.compare(operator.ne, other)
+
+    def __lt__(self, other):
+        return self.array.compare(operator.lt, other)
+
+    def __le__(self, other):
+        return self.array.compare(operator.le, other)
+
+    def __gt__(self, other):
+        return self.array.compare(operator.gt, other)
+
+    def __ge__(self, other):
+        return self.array.compare(operator.ge, other)
+
+    __hash__ = object.__hash__
+
+    def between(self, low, high):
+        return (self >= low) & (self <= high)
+
+    def in_(self, values):
+        return self.array.isin(values)
+
+    def cast(self, type_):
+        return _Expr(self.array.text())
+
+    def ilike(self, pattern, escape=None):
+        return self.array.text().matches(_like_pattern(pattern, re.I, escape))
+
+    def like(self, pattern, escape=None):
+        return self.array.text().matches(_like_pattern(pattern, 0, escape))
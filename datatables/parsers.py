@@ -0,0 +1,48 @@
+from __future__ import absolute_import
+
+import datetime
+from functools import lru_cache
+
+from dateutil.parser import parse as date_parse
+
+# the same filter values come back on every paging request
+CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_date(value, date_format=None):
+    """Parse a search value to a datetime.
+
+    The value is parsed with `date_format` when given, else as ISO 8601,
+    falling back to the slower but fully general dateutil parser.
+
+    :param value: search value
+    :param date_format: strptime format of the value (default None)
+    :type value: str
+    :type date_format: str
+    :rtype: datetime.datetime
+    :raises ValueError: when the value can't be parsed
+    """
+    if date_format is not None:
+        return datetime.datetime.strptime(value, date_format)
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    try:
+        return date_parse(value)
+    except OverflowError as exc:
+        raise ValueError(str(exc))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_number(value):
+    """Parse a search value to a float, an empty value being 0.
+
+    :type value: str
+    :rtype: float
+    :raises ValueError: when the value can't be parsed
+    """
+    if value == "":
+        return 0.0
+    return float(value)
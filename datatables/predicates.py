@@ -0,0 +1,193 @@
+from __future__ import absolute_import
+
+import datetime
+import decimal
+import enum
+
+from sqlalchemy import Boolean, Text, any_, bindparam
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+from datatables.parsers import parse_date, parse_number
+
+# lists of values larger than this are bound as a single array on PostgreSQL
+LARGE_IN_THRESHOLD = 20
+
+TRUE_VALUES = ["1", "t", "true", "y", "yes", "on"]
+FALSE_VALUES = ["0", "f", "false", "n", "no", "off"]
+
+
+# python types search values can be coerced to
+COERCIBLE_TYPES = (str, bool, int, float, decimal.Decimal, datetime.date, enum.Enum)
+
+
+def python_type_of(expr):
+    """Return the python type of an expression, None when not coercible."""
+    try:
+        python_type = expr.type.python_type
+    except (AttributeError, NotImplementedError):
+        return None
+    if not issubclass(python_type, COERCIBLE_TYPES):
+        return None
+    return python_type
+
+
+def coerce_value(expr, value):
+    """Coerce a search value to the type of an expression.
+
+    Comparing the expression with a value of its own type needs no cast, so
+    the database can use the indexes of the expression.
+
+    :param expr: SQLAlchemy expression of the column
+    :param value: search value
+    :type value: str
+    :returns: the coerced value
+    :raises ValueError: when the value isn't of the type of the expression
+    """
+    python_type = python_type_of(expr)
+    if python_type is None or python_type is str:
+        return value
+    if python_type is bool:
+        if value.lower() in TRUE_VALUES:
+            return True
+        if value.lower() in FALSE_VALUES:
+            return False
+        raise ValueError("{!r} is not a boolean".format(value))
+    if python_type is datetime.datetime:
+        return parse_date(value)
+    if python_type is datetime.date:
+        return parse_date(value).date()
+    if python_type is decimal.Decimal:
+        try:
+            return decimal.Decimal(value)
+        except decimal.InvalidOperation:
+            raise ValueError("{!r} is not a decimal".format(value))
+    if issubclass(python_type, enum.Enum):
+        try:
+            return python_type[value]
+        except KeyError:
+            return python_type(value)
+    return python_type(value)
+
+
+def coerce_number(expr, value, rounding=None):
+    """Coerce a numeric search value to the type of an expression.
+
+    :param expr: SQLAlchemy expression of the column
+    :param value: search value, an empty value being 0
+    :param rounding: function rounding a fractional value to an integer for
+        integer expressions (default None, the value is kept as a float)
+    :type value: str
+    :raises ValueError: when the value isn't a number
+    """
+    number = parse_number(value)
+    python_type = python_type_of(expr)
+    if python_type is int:
+        if number.is_integer():
+            return int(number)
+        if rounding is not None:
+            return int(rounding(number))
+    elif python_type is decimal.Decimal and value != "":
+        return decimal.Decimal(value.strip())
+    return number
+
+
+def coerce_date(expr, value, date_format=None):
+    """Coerce a date search value to the type of an expression.
+
+    :param expr: SQLAlchemy expression of the column
+    :param value: search value
+    :param date_format: strptime format of the value (default None)
+    :type value: str
+    :raises ValueError: when the value isn't a date
+    """
+    date_value = parse_date(value, date_format)
+    if python_type_of(expr) is datetime.date:
+        return date_value.date()
+    return date_value
+
+
+def compile_range(expr, low, high):
+    """Return the predicate `low <= expr <= high`, a None bound being open.
+
+    Open ranges compile to single-sided comparisons instead of bounds
+    sentinels, so that range indexes can be used, and a range without
+    bounds to no predicate at all.
+    """
+    if low is None and high is None:
+        return None
+    if low is None:
+        return expr <= high
+    if high is None:
+        return expr >= low
+    return expr.between(low, high)
+
+
+def starts_with(expr, prefix):
+    """Return the predicate `expr LIKE 'prefix%'`, wildcards escaped.
+
+    The pattern is a bound parameter ending with the only wildcard, rather
+    than a concatenation in SQL. An index can serve it where the database
+    supports prefix LIKE on it, e.g. with `text_pattern_ops` or the C
+    collation on PostgreSQL.
+    """
+    return as_text(expr).like(_escape_like(prefix) + "%", escape="/")
+
+
+def contains(expr, value):
+    """Return the predicate `expr LIKE '%value%'`, wildcards escaped."""
+    return as_text(expr).like("%" + _escape_like(value) + "%", escape="/")
+
+
+def _escape_like(value):
+    return value.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+
+def as_text(expr):
+    """Cast an expression to text for pattern matching, when not a string."""
+    python_type = python_type_of(expr)
+    if python_type is None or python_type is str:
+        return expr
+    return expr.cast(Text)
+
+
+class InValues(ColumnElement):
+    """`expr IN (values)`, rendered `expr = ANY(:values)` on PostgreSQL.
+
+    PostgreSQL binds the values as a single array, so that the statement
+    stays the same whatever the number of values. Other dialects use an
+    expanding bind parameter.
+    """
+
+    __visit_name__ = "in_values"
+    inherit_cache = True
+    type = Boolean()
+
+    _traverse_internals = [
+        ("in_clause", InternalTraversal.dp_clauseelement),
+        ("any_clause", InternalTraversal.dp_clauseelement),
+    ]
+
+    def __init__(self, expr, values):
+        self.in_clause = expr.in_(values)
+        array = bindparam(None, values, type_=postgresql.ARRAY(expr.type))
+        self.any_clause = expr == any_(array)
+
+
+@compiles(InValues)
+def _compile_in_values(element, compiler, **kw):
+    return compiler.process(element.in_clause, **kw)
+
+
+@compiles(InValues, "postgresql")
+def _compile_in_values_postgresql(element, compiler, **kw):
+    return compiler.process(element.any_clause, **kw)
+
+
+def in_values(expr, values):
+    """Return the predicate `expr IN (values)` for a list of any length."""
+    if len(values) > LARGE_IN_THRESHOLD:
+        return InValues(expr, values)
+    return expr.in_(values)
@@ -0,0 +1,41 @@
+from __future__ import absolute_import
+
+from sqlalchemy import and_, func, select
+
+from datatables.predicates import as_text
+
+SEPARATOR = ", "
+
+
+def exists_related(related, predicate):
+    """Return `EXISTS` of the related rows matching a predicate.
+
+    The subquery is correlated to the base entity, so that searching a
+    related column needs no join multiplying the rows of the base query.
+
+    :param related: relationship attribute from the base entity
+    :param predicate: predicate on the columns of the related entity
+    """
+    if predicate is None:
+        return None
+    if related.property.uselist:
+        return related.any(predicate)
+    return related.has(predicate)
+
+
+def aggregate_related(related, expr):
+    """Return the values of the related rows, as a correlated subquery.
+
+    The values are aggregated into a single string, separated by commas.
+
+    :param related: relationship attribute from the base entity
+    :param expr: expression of a column of the related entity
+    """
+    prop = related.property
+    criterion = prop.primaryjoin
+    tables = [prop.target]
+    if prop.secondary is not None:
+        criterion = and_(criterion, prop.secondaryjoin)
+        tables.append(prop.secondary)
+    statement = select(func.aggregate_strings(as_text(expr), SEPARATOR))
+    return statement.where(criterion).correlate_except(*tables).scalar_subquery()
@@ -1,9 +1,20 @@
-import datetime
 import logging
+import math
+from functools import lru_cache
 
-from dateutil.parser import parse as date_parse
 from sqlalchemy import Text
 
+from datatables.parsers import CACHE_SIZE
+from datatables.predicates import (
+    as_text,
+    coerce_date,
+    coerce_number,
+    coerce_value,
+    compile_range,
+    in_values,
+    python_type_of,
+)
+
 logger = logging.getLogger(__name__)
 
 search_operators = {
@@ -15,6 +26,7 @@ search_operators = {
 }
 
 
+@lru_cache(maxsize=CACHE_SIZE)
 def parse_query_value(combined_value):
     """Parse value in form of '>value' to a lambda and a value."""
     split = len(combined_value) - len(combined_value.lstrip("<>="))
@@ -34,56 +46,68 @@ def parse_query_value(combined_value):
 
 def numeric_query(expr, value):
     operator_func, value = parse_query_value(value)
-    if value == "":
-        num_value = 0
-    else:
-        num_value = float(value)
+    num_value = coerce_number(expr, value)
 
     return operator_func(expr, num_value)
 
 
-def date_query(expr, value):
+def date_query(expr, value, date_format=None):
     operator_func, value = parse_query_value(value)
-    try:
-        date_value = date_parse(value)
-    except ValueError:
-        date_value = datetime.datetime.now()
+    # an unparsable value raises ValueError, as with yadcf_range_date
+    date_value = coerce_date(expr, value, date_format)
 
     return operator_func(expr, date_value)
 
 
 def yadcf_range_number(expr, value):
     v_from, v_to = value.split("-yadcf_delim-")
-    v_from = float(v_from) if v_from != "" else -float("inf")
-    v_to = float(v_to) if v_to != "" else float("inf")
-    logger.debug("yadcf_range_number: between %f and %f", v_from, v_to)
-    return expr.between(v_from, v_to)
+    v_from = coerce_number(expr, v_from, math.ceil) if v_from != "" else None
+    v_to = coerce_number(expr, v_to, math.floor) if v_to != "" else None
+    logger.debug("yadcf_range_number: between %s and %s", v_from, v_to)
+    return compile_range(expr, v_from, v_to)
 
 
-def yadcf_range_date(expr, value):
+def yadcf_range_date(expr, value, date_format=None):
     v_from, v_to = value.split("-yadcf_delim-")
-    v_from = date_parse(v_from) if v_from != "" else datetime.date.min
-    v_to = date_parse(v_to) if v_to != "" else datetime.date.max
+    v_from = coerce_date(expr, v_from, date_format) if v_from != "" else None
+    v_to = coerce_date(expr, v_to, date_format) if v_to != "" else None
     logger.debug("yadcf_range_date: between %s and %s", v_from, v_to)
-    return expr.between(v_from, v_to)
+    return compile_range(expr, v_from, v_to)
+
+
+def string_contains(expr, value):
+    return as_text(expr).ilike("%" + value + "%")
 
 
 def yadcf_multi_select(expr, value):
     options = value.split("|")
     logger.debug("yadcf_multi_select: in %s", options)
-    return expr.cast(Text).in_(options)
+    if python_type_of(expr) is None:
+        return expr.cast(Text).in_(options)
+
+    # compare with values of the column type, so that its indexes are used
+    values = []
+    for option in options:
+        try:
+            values.append(coerce_value(expr, option))
+        except ValueError:
+            logger.debug("yadcf_multi_select: ignoring %r", option)
+    return in_values(expr, values)
+
 
+# search methods accepting a date_format
+DATE_SEARCH_METHODS = ["date", "yadcf_range_date"]
 
 SEARCH_METHODS = {
     "none": lambda expr, value: None,
-    "string_contains": lambda expr, value: expr.ilike("%" + value + "%"),
-    "ilike": lambda expr, value: expr.ilike(value),
-    "like": lambda expr, value: expr.like(value),
+    "string_contains": string_contains,
+    "ilike": lambda expr, value: as_text(expr).ilike(value),
+    "like": lambda expr, value: as_text(expr).like(value),
     "numeric": numeric_query,
     "date": date_query,
-    "yadcf_text": lambda expr, value: expr.ilike("%" + value + "%"),
+    "yadcf_text": string_contains,
     "yadcf_autocomplete": lambda expr, value: expr == value,
-    "yadcf_select": lambda expr, value: expr.ilike("%" + value + "%"),
+    "yadcf_select": string_contains,
     "yadcf_multi_select": yadcf_multi_select,
     "yadcf_range_number": yadcf_range_number,
     "yadcf_range_number_slider": yadcf_range_number,
@@ -0,0 +1,299 @@
+from __future__ import absolute_import
+
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from sqlalchemy.sql import Select
+
+from datatables.datatables import DataTables, make_facet, make_other_facet
+from datatables.spec import column_flag
+
+# dialects sorting NULLs after the other values by default
+NULLS_LARGEST_DIALECTS = ["postgresql", "oracle"]
+
+
+class ShardedDataTables:
+    """DataTables over several shards with identical schemas.
+
+    The shards, such as databases or tables split by tenant or month, are
+    queried concurrently: their counts are summed, and the first
+    `start + length` rows of each one, in the requested sort, are merged into
+    the exact page of all the shards. yadcf values are merged too, facets
+    being counted over all their values on each shard and capped once
+    merged. The rows are merged by comparing their python values, which sort
+    as in the database unless strings use a collation other than binary.
+
+    Each shard runs as a DataTables draw with the options given, such as
+    routing, time budget, coordination or `max_rows`. `max_length` applies
+    to the page of all the shards, and `on_limit='stream'` isn't supported.
+
+    :param request: request containing the GET values, specified by the
+        datatable for filtering, sorting and paging
+    :type request: pyramid.request
+    :param sources: (session, query) of each shard, the session being a
+        connection or an engine for a Core select query
+    :type sources: list
+    :param columns: columns specification for the datatables, the same for
+        all the shards
+    :type columns: list
+    :param allow_regex_searches: allow regex global searches (default False)
+    :type allow_regex_searches: bool
+    :param executor: executor running the statements of the shards, each
+        shard in its own task (default None, a thread per shard)
+    :type executor: concurrent.futures.Executor
+    :param options: keyword options of the DataTables of each shard
+
+    :returns: a ShardedDataTables object
+    """
+
+    def __init__(
+        self,
+        request,
+        sources,
+        columns,
+        allow_regex_searches=False,
+        executor=None,
+        **options
+    ):
+        """Initialize object and run the queries of the shards."""
+        self.params = dict(request)
+        if not sources:
+            raise ValueError("At least one shard is required.")
+        if options.get("on_limit") == "stream":
+            raise ValueError("Shards can't stream their pages.")
+        self.sources = sources
+        self.columns = columns
+        self.allow_regex_searches = allow_regex_searches
+        self.executor = executor
+        self.options = options
+        self.shards = []
+        self.results = None
+        self.cardinality = 0
+        self.cardinality_filtered = 0
+        self.yadcf_params = []
+        self.truncated = False
+        self.error = None
+        try:
+            self.run()
+        except Exception as exc:
+            self.error = str(exc)
+
+    def output_result(self):
+        """Output results in the format needed by DataTables."""
+        output = {}
+        output["draw"] = str(int(self.params.get("draw", 1)))
+        output["recordsTotal"] = (
+            str(self.cardinality) if self.cardinality is not None else None
+        )
+        output["recordsFiltered"] = str(self.cardinality_filtered)
+        if self.error:
+            output["error"] = self.error
+            return output
+
+        output["data"] = self.results
+        for k, v in self.yadcf_params:
+            output[k] = v
+        if self.truncated:
+            output["truncated"] = True
+        return output
+
+    def run(self):
+        """Run the draws of all the shards and merge their results."""
+        # the paging of the whole page, validated against max_length
+        session, query = self.sources[0]
+        table = _shard_table(
+            DataTables,
+            self.params,
+            session,
+            query,
+            self.columns,
+            self.allow_regex_searches,
+            self.options,
+        )
+        table._prepare()
+        stop = table.start + table.length if table.length >= 0 else None
+
+        # each shard fetches its rows up to the end of the page
+        params = dict(self.params, start="0", length=str(-1 if stop is None else stop))
+        options = dict(self.options, max_length=None)
+        if table.facet_limit is not None:
+            options["facet_limit"] = -1
+        self.shards = []
+        for i, (session, query) in enumerate(self.sources):
+            shard_options = dict(options)
+            if options.get("coordination_key") is not None:
+                # the draws of the shards mustn't supersede each other
+                shard_options["coordination_key"] = (options["coordination_key"], i)
+            self.shards.append(
+                _shard_table(
+                    _ShardTable,
+                    params,
+                    session,
+                    query,
+                    self.columns,
+                    self.allow_regex_searches,
+                    shard_options,
+                )
+            )
+
+        if self.executor is None:
+            with ThreadPoolExecutor(max_workers=len(self.shards)) as executor:
+                list(executor.map(_run_shard, self.shards))
+        else:
+            futures = [self.executor.submit(_run_shard, s) for s in self.shards]
+            for future in futures:
+                future.result()
+
+        totals = [shard.cardinality for shard in self.shards]
+        # unknown when a shard ran out of time for it
+        self.cardinality = None if None in totals else sum(totals)
+        self.cardinality_filtered = sum(s.cardinality_filtered for s in self.shards)
+
+        merged = heapq.merge(
+            *[shard.results for shard in self.shards], key=lambda row: row.sort_key
+        )
+        self.results = [dict(row) for row in islice(merged, table.start, stop)]
+        self.truncated = table.truncated or any(s.truncated for s in self.shards)
+
+        for name, _ in self.shards[0].yadcf_params:
+            values = [dict(shard.yadcf_params).get(name) for shard in self.shards]
+            # skipped by a shard out of time budget
+            if None not in values:
+                merged_values = _merge_yadcf(values, table.facet_limit)
+                self.yadcf_params.append((name, merged_values))
+
+
+class _ShardTable(DataTables):
+    """DataTables of a shard, keeping the sort values of its rows."""
+
+    def rows_query(self, query=None):
+        query = super().rows_query(query)
+        return query.add_columns(*[self.spec.expressions[i] for i, _ in _orders(self)])
+
+    def _make_rows(self, rows):
+        nulls_largest = self._dialect().name in NULLS_LARGEST_DIALECTS
+        directions = [
+            _direction(self.columns[i], direction, nulls_largest)
+            for i, direction in _orders(self)
+        ]
+        names = self.spec.column_names
+        return [
+            _KeyedRow(zip(names, row), _SortKey(row[len(names) :], directions))
+            for row in rows
+        ]
+
+
+class _KeyedRow(dict):
+    """Row of a shard, with the sort values it is merged with."""
+
+    __slots__ = ("sort_key",)
+
+    def __init__(self, items, sort_key):
+        super().__init__(items)
+        self.sort_key = sort_key
+
+
+def _run_shard(table):
+    """Count, fetch the first rows and the yadcf values of a shard."""
+    table.run()
+
+
+def _shard_table(cls, params, session, query, columns, allow_regex_searches, options):
+    """Return the lazy DataTables of a shard."""
+    if isinstance(query, Select):
+        options = dict(options, connection=session)
+    else:
+        query = query.with_session(session)
+    return cls(
+        params,
+        query,
+        columns,
+        allow_regex_searches=allow_regex_searches,
+        lazy=True,
+        **options
+    )
+
+
+def _orders(table):
+    """Return the (column index, direction) of the sorts of a request."""
+    orders = []
+    i = 0
+    while table.params.get("order[{:d}][column]".format(i), False):
+        column_nr = int(table.params.get("order[{:d}][column]".format(i)))
+        if column_flag(table.params, column_nr, "orderable"):
+            orders.append((column_nr, table.params.get("order[{:d}][dir]".format(i))))
+        i += 1
+    return orders
+
+
+def _direction(column, direction, nulls_largest):
+    """Return (descending, nulls first) of a sort, as the database sorts."""
+    descending = direction == "desc"
+    if column.nulls_order:
+        return descending, column.nulls_order == "nullsfirst"
+    return descending, descending == nulls_largest
+
+
+class _SortKey:
+    """Sort values of a row, compared with the directions of the sorts."""
+
+    __slots__ = ("values", "directions")
+
+    def __init__(self, values, directions):
+        self.values = values
+        self.directions = directions
+
+    def __lt__(self, other):
+        for a, b, (descending, nulls_first) in zip(
+            self.values, other.values, self.directions
+        ):
+            if a is None or b is None:
+                if a is None and b is None:
+                    continue
+                return (a is None) == nulls_first
+            if a != b:
+                return a > b if descending else a < b
+        return False
+
+
+def _merge_yadcf(values, facet_limit=None):
+    """Merge the yadcf values of the shards, empty shards included."""
+    if any(isinstance(v, tuple) for v in values):
+        # range of a slider, (None, None) for a shard without values
+        lows = [v[0] for v in values if v[0] is not None]
+        highs = [v[1] for v in values if v[1] is not None]
+        return (min(lows, default=None), max(highs, default=None))
+    if any(v and isinstance(v[0], dict) for v in values):
+        return _merge_facets(values, facet_limit)
+    merged = []
+    seen = set()
+    for shard_values in values:
+        for value in shard_values:
+            if value not in seen:
+                seen.add(value)
+                merged.append(value)
+    return merged
+
+
+def _merge_facets(values, facet_limit):
+    """Sum the counts of all the values of the shards, then cap them."""
+    counts = {}
+    other = 0
+    for shard_facets in values:
+        for facet in shard_facets:
+            if facet.get("other"):
+                other += facet["count"]
+            else:
+                counts[facet["value"]] = counts.get(facet["value"], 0) + facet["count"]
+    # by count, then by value, NULL first
+    ranked = sorted(
+        counts.items(), key=lambda item: (-item[1], item[0] is not None, item[0])
+    )
+    if facet_limit >= 0:
+        other += sum(c for _, c in ranked[facet_limit:])
+        ranked = ranked[:facet_limit]
+    facets = [make_facet(v, c) for v, c in ranked]
+    if other:
+        facets.append(make_other_facet(other))
+    return facets
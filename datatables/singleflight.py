@@ -0,0 +1,184 @@
+from __future__ import absolute_import
+
+import asyncio
+import copy
+import hashlib
+import threading
+
+from sqlalchemy.sql import Select
+
+from datatables.datatables import DataTables
+from datatables.versioning import normalized_params
+
+
+def fingerprint(params, query, columns, connection=None, **options):
+    """Return a key identifying the response of a request.
+
+    Requests are identical when their parameters, but the `draw` echo and
+    the cache buster of jQuery, are the same, for the same base query run on
+    the same database, columns and options.
+
+    :param params: request containing the GET values
+    :param query: base query of the DataTables
+    :param columns: columns specification for the datatables
+    :param connection: connection or engine running a Core select query
+    :param options: other keyword options of the DataTables
+    :rtype: str
+    """
+    expressions = [column.sqla_expr for column in columns]
+    if isinstance(query, Select):
+        statement, bind = query.add_columns(*expressions), connection
+    else:
+        statement = query.add_columns(*expressions).statement
+        bind = query.session.get_bind()
+    compiled = statement.compile(bind=bind)
+    parts = [
+        str(bind.engine.url) if bind is not None else "",
+        str(compiled),
+        repr(sorted(compiled.params.items())),
+        repr(normalized_params(params)),
+        repr(sorted(options.items())),
+    ]
+    for column in columns:
+        parts.append(
+            repr(
+                (
+                    str(column.sqla_expr),
+                    column.mData,
+                    column.search_method,
+                    column.nulls_order,
+                    column.global_search,
+                    column.date_format,
+                    str(column.related),
+                    vars(column.formatter) if column.formatter is not None else None,
+                )
+            )
+        )
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """Share one execution between identical concurrent calls.
+
+    A call made while an identical one, with the same key, is in flight
+    waits for it and gets its result, or its exception, instead of running
+    again. Works with threads, with `do()`, and with asyncio, with
+    `do_async()`.
+
+    Usage::
+
+        flight = SingleFlight()
+
+        @view_config(route_name="data", renderer="json")
+        def data(request):
+            return flight.output_result(request.GET, query, columns)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+
+    def do(self, key, function):
+        """Return the result of `function()`, shared with identical calls.
+
+        :param key: hashable identifying the call
+        :param function: callable run by the first call of the key
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            return call.get()
+
+        try:
+            call.result = function()
+        except BaseException as exc:
+            call.error = exc
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.get()
+
+    async def do_async(self, key, function):
+        """Return the awaited result of `function()`, shared with identical calls.
+
+        :param key: hashable identifying the call, within the running loop
+        :param function: callable returning an awaitable, called by the first
+            call of the key
+        """
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get((loop, key))
+        if task is None:
+            task = asyncio.ensure_future(function())
+            self._tasks[loop, key] = task
+            task.add_done_callback(lambda _: self._tasks.pop((loop, key), None))
+        # a cancelled caller doesn't cancel the call of the others
+        return await asyncio.shield(task)
+
+    def output_result(self, request, query, columns, **options):
+        """Output the results of a DataTables, shared with identical requests.
+
+        Each caller gets its own copy of the output, with its own `draw`.
+
+        :param request: request containing the GET values
+        :param query: base query of the DataTables
+        :param columns: columns specification for the datatables
+        :param options: keyword options of the DataTables
+        """
+        params = dict(request)
+        key = fingerprint(params, query, columns, **options)
+        output = self.do(
+            key, lambda: DataTables(params, query, columns, **options).output_result()
+        )
+        return _with_draw(output, params)
+
+    async def output_result_async(
+        self, request, query, columns, executor=None, **options
+    ):
+        """Output the results of a DataTables from a coroutine.
+
+        The DataTables runs in an executor, shared with identical requests as
+        in `output_result`.
+
+        :param executor: executor running the DataTables (default None, the
+            default executor of the loop)
+        """
+        params = dict(request)
+        key = fingerprint(params, query, columns, **options)
+        loop = asyncio.get_running_loop()
+
+        def run():
+            return DataTables(params, query, columns, **options).output_result()
+
+        output = await self.do_async(key, lambda: loop.run_in_executor(executor, run))
+        return _with_draw(output, params)
+
+
+class _Call:
+    """Call in flight, and then its result."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def get(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def _with_draw(output, params):
+    """Return a copy of an output, with the `draw` of a request.
+
+    The copy is deep, so that a caller changing its rows doesn't change the
+    output of the others.
+    """
+    output = copy.deepcopy(output)
+    output["draw"] = str(int(params.get("draw", 1)))
+    return output
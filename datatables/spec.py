@@ -0,0 +1,146 @@
+from __future__ import absolute_import
+
+from functools import partial
+
+from sqlalchemy.sql import Select
+
+from datatables.column_dt import ColumnDT
+from datatables.related import aggregate_related
+from datatables.search_methods import SEARCH_METHODS
+
+
+class DataTablesSpec:
+    """Static part of a DataTables, built once and executed per request.
+
+    Everything which doesn't depend on the request is resolved when the
+    spec is built: the columns are validated, their names and search
+    functions are looked up, and the projection of the columns is resolved
+    once per dialect.
+
+    :param query: the query wanted to be seen in the the table, its session
+        can be replaced on each execution, or a Core select
+    :type query: sqlalchemy.orm.query.Query or sqlalchemy.sql.Select
+    :param columns: columns specification for the datatables
+    :type columns: list
+    :param allow_regex_searches: allow regex global searches (default False)
+    :type allow_regex_searches: bool
+    :param options: default keyword options of the DataTables executed
+
+    :returns: a DataTablesSpec object
+
+    Usage::
+
+        users_table = DataTablesSpec(
+            DBSession.query().select_from(User), [ColumnDT(User.id)]
+        )
+
+        @view_config(route_name="data", renderer="json")
+        def data(request):
+            return users_table.execute(request.GET, DBSession).output_result()
+    """
+
+    def __init__(self, query, columns, allow_regex_searches=False, **options):
+        """Validate the columns and resolve everything static."""
+        columns = list(columns)
+        if not columns:
+            raise ValueError("At least one column is required.")
+        for column in columns:
+            if not isinstance(column, ColumnDT):
+                raise ValueError("{!r} is not a ColumnDT.".format(column))
+
+        self.query = query
+        self.columns = columns
+        self.allow_regex_searches = allow_regex_searches
+        self.options = options
+
+        self.column_names = [
+            col.mData if col.mData else str(i) for i, col in enumerate(columns)
+        ]
+        if len(set(self.column_names)) != len(self.column_names):
+            raise ValueError("Column names (mData) should be unique.")
+
+        self.expressions = [_expression(c) for c in columns]
+        self.search_functions = [_search_function(c) for c in columns]
+        self._projections = {}
+
+    def projection(self, dialect):
+        """Return the expressions of the columns and the python formatters.
+
+        Formatters which compile to SQL for the dialect are applied to the
+        expressions, the other ones are returned with the index of their
+        column, to be applied to the fetched rows.
+
+        :returns: the list of expressions and the list of (index, formatter)
+        """
+        if dialect.name not in self._projections:
+            expressions = []
+            formatters = []
+            for i, column in enumerate(self.columns):
+                expr = self.expressions[i]
+                if column.formatter is not None:
+                    formatted = column.formatter.sql(expr, dialect)
+                    if formatted is None:
+                        formatters.append((i, column.formatter))
+                    else:
+                        expr = formatted
+                expressions.append(expr)
+            self._projections[dialect.name] = (expressions, formatters)
+        return self._projections[dialect.name]
+
+    def execute(self, params, session=None, lazy=True, **options):
+        """Execute the spec for the parameters of a request.
+
+        :param params: request containing the GET values, specified by the
+            datatable for filtering, sorting and paging
+        :param session: session to run the statements on (default None, the
+            session of the query), or connection or engine of a select query
+        :param lazy: only run the statements when their data is requested,
+            with `page()`, `counts()`, `yadcf_data()` or `output_result()`
+            (default True)
+        :param options: keyword options of DataTables, overriding the ones of
+            the spec
+
+        :returns: a DataTables object
+        """
+        from datatables.datatables import DataTables
+
+        query = self.query
+        kwargs = dict(self.options, **options)
+        if isinstance(query, Select):
+            kwargs["connection"] = session
+        elif session is not None:
+            query = query.with_session(session)
+        return DataTables(
+            params,
+            query,
+            self.columns,
+            allow_regex_searches=self.allow_regex_searches,
+            spec=self,
+            lazy=lazy,
+            **kwargs
+        )
+
+
+def column_flag(params, index, flag):
+    """Return a flag of a column in a request, true when not sent.
+
+    :param params: request containing the GET values
+    :param index: index of the column
+    :param flag: 'searchable', 'orderable' or 'visible'
+    :rtype: bool
+    """
+    return params.get("columns[{:d}][{}]".format(index, flag), "true") != "false"
+
+
+def _expression(column):
+    """Return the expression of the values shown in a column."""
+    if column.related is not None:
+        return aggregate_related(column.related, column.sqla_expr)
+    return column.sqla_expr
+
+
+def _search_function(column):
+    search_func = SEARCH_METHODS[column.search_method]
+    if column.date_format:
+        return partial(search_func, date_format=column.date_format)
+    return search_func
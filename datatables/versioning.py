@@ -0,0 +1,148 @@
+from __future__ import absolute_import
+
+import hashlib
+import itertools
+import threading
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+# request parameters which don't change the rows of a draw
+IGNORED_PARAMS = ["draw", "_"]
+
+
+def normalized_params(params):
+    """Return the parameters of a request which change its rows, sorted."""
+    return sorted((k, v) for k, v in params.items() if k not in IGNORED_PARAMS)
+
+
+def make_etag(params, version):
+    """Return the ETag of the response to a request for a data version.
+
+    :param params: request containing the GET values
+    :param version: data version of the base query
+    :rtype: str
+    """
+    text = repr((normalized_params(params), version))
+    return '"{}"'.format(hashlib.sha1(text.encode("utf-8")).hexdigest())
+
+
+def etag_matches(etag, if_none_match):
+    """Return True when an If-None-Match header matches an ETag.
+
+    :param etag: current ETag
+    :param if_none_match: value of the If-None-Match header, or None
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # weak comparison, as the responses are equivalent
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in tags)
+
+
+def conditional_output(table, if_none_match):
+    """Return the ETag of a lazy DataTables, and its output when modified.
+
+    Only the data version is read when the client's version still matches,
+    none of the statements of the draw are run.
+
+    :param table: DataTables with a `data_version`, created with `lazy=True`
+    :param if_none_match: value of the If-None-Match header, or None
+    :returns: the ETag, and the output or None when not modified
+    """
+    etag = table.etag()
+    if etag_matches(etag, if_none_match):
+        return etag, None
+    return etag, table.output_result()
+
+
+def max_version(column):
+    """Return a data version of the maximum of a column and the row count.
+
+    Adapted to an `updated_at` or version column: updates raise the
+    maximum, and deletes change the count. Both are read with a single
+    aggregate statement.
+
+    :param column: column of the base query increasing on every change
+    :returns: callable taking the base query and returning its version
+    """
+
+    def version(query):
+        return tuple(query.add_columns(func.max(column), func.count()).one())
+
+    return version
+
+
+class ChangeCounter:
+    """Data version counting the committed changes of entities.
+
+    Inserts, updates and deletes of the entities, flushed or run as bulk
+    statements, bump the counter when their session commits. Only the
+    changes made in this process are counted.
+
+    Usage::
+
+        users_version = ChangeCounter(User)
+
+        rowTable = DataTables(
+            request.GET, query, columns, lazy=True, data_version=users_version
+        )
+    """
+
+    def __init__(self, *entities):
+        self.entities = entities
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self.value = 0
+        self._listeners = []
+        self._info_key = "datatables_changes_{:d}".format(id(self))
+        self._listen(Session, "after_flush", self._after_flush)
+        self._listen(Session, "do_orm_execute", self._do_orm_execute)
+        self._listen(Session, "after_commit", self._after_commit)
+        self._listen(Session, "after_rollback", self._after_rollback)
+
+    def __call__(self, query):
+        return self.value
+
+    def bump(self):
+        """Change the version, for changes the events don't see."""
+        with self._lock:
+            self.value = next(self._counter)
+
+    def close(self):
+        """Remove every event listener installed by the counter."""
+        for target, identifier, fn in self._listeners:
+            event.remove(target, identifier, fn)
+        self._listeners = []
+
+    def _listen(self, target, identifier, fn):
+        event.listen(target, identifier, fn)
+        self._listeners.append((target, identifier, fn))
+
+    def _tracks(self, cls):
+        return any(issubclass(cls, entity) for entity in self.entities)
+
+    def _after_flush(self, session, flush_context):
+        changed = itertools.chain(session.new, session.dirty, session.deleted)
+        if any(self._tracks(type(instance)) for instance in changed):
+            session.info[self._info_key] = True
+
+    def _do_orm_execute(self, orm_execute_state):
+        # bulk statements don't go through the flush
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and self._tracks(mapper.class_):
+            if (
+                orm_execute_state.is_insert
+                or orm_execute_state.is_update
+                or orm_execute_state.is_delete
+            ):
+                orm_execute_state.session.info[self._info_key] = True
+
+    def _after_commit(self, session):
+        if session.info.pop(self._info_key, False):
+            self.bump()
+
+    def _after_rollback(self, session):
+        session.info.pop(self._info_key, None)
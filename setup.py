@@ -32,7 +32,8 @@ setup(
     packages=["datatables"],
     include_package_data=True,
     zip_safe=False,
-    install_requires=["sqlalchemy", "python-dateutil",],
+    python_requires=">=3.8",
+    install_requires=["sqlalchemy>=2.0.21", "python-dateutil",],
     extras_require={
         "dev": [
             "faker",
@@ -47,6 +48,7 @@ setup(
             "yapf",
         ],
         "examples": [FLASK_EXAMPLE + PYRAMID_EXAMPLE],
+        "numpy": ["numpy"],
     },
     py_modules=["datatables"],
     test_suite="tests",
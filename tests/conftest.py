@@ -46,3 +46,27 @@ def session(engine):
     yield session
 
     session.close()
+
+
+@pytest.fixture(scope="session")
+def file_engine(tmp_path_factory):
+    """Use a file database so that every pooled connection sees the data."""
+    path = tmp_path_factory.mktemp("db").joinpath("datatables.sqlite")
+    engine = create_engine("sqlite:///{}".format(path), echo=False)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    populate(session)
+    session.close()
+
+    yield engine
+
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def file_session(file_engine):
+    session = sessionmaker(bind=file_engine)()
+
+    yield session
+
+    session.close()
@@ -39,3 +39,17 @@ def test_with_invalid_search_method():
     """Return column with a specific filter."""
     with pytest.raises(ValueError):
         ColumnDT(User.name, search_method="invalid")
+
+
+def test_with_valid_date_format():
+    """Return column with a date format."""
+    col = ColumnDT(User.birthday, search_method="date", date_format="%d/%m/%Y")
+
+    if col.date_format != "%d/%m/%Y":
+        raise AssertionError()
+
+
+def test_with_invalid_date_format():
+    """Return column with a date format for a non date search method."""
+    with pytest.raises(ValueError):
+        ColumnDT(User.name, date_format="%d/%m/%Y")
@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+
+from datatables import ColumnDT, DataTables
+from datatables.coordination import DrawCoordinator, DrawSuperseded
+
+from .helpers import create_dt_params
+from .models import User
+
+
+def test_newer_draw_supersedes():
+    """Test if beginning a newer draw supersedes the older one."""
+    coordinator = DrawCoordinator()
+    first = coordinator.begin("client", 1)
+    second = coordinator.begin("client", 2)
+    other = coordinator.begin("other client", 1)
+
+    assert first.superseded
+    assert not second.superseded
+    assert not other.superseded
+    with pytest.raises(DrawSuperseded):
+        first.check()
+
+
+def test_latest_arrival_supersedes():
+    """Test if the latest draw to arrive wins, whatever its draw counter."""
+    coordinator = DrawCoordinator()
+    # a draw of the page before a reload, which restarts the counter at 1
+    before_reload = coordinator.begin("client", 3)
+    after_reload = coordinator.begin("client", 1)
+
+    assert before_reload.superseded
+    assert not after_reload.superseded
+
+
+class RacingCoordinator(DrawCoordinator):
+    """Coordinator where a newer draw arrives right after each draw."""
+
+    def begin(self, key, draw):
+        token = super(RacingCoordinator, self).begin(key, draw)
+        super(RacingCoordinator, self).begin(key, draw + 1)
+        return token
+
+
+def test_superseded_draw_skips_statements(session):
+    """Test if a superseded draw doesn't run its statements."""
+    coordinator = RacingCoordinator()
+    columns = [ColumnDT(User.id)]
+
+    query = session.query().select_from(User)
+
+    params = create_dt_params(columns)
+    rowTable = DataTables(
+        params, query, columns, coordinator=coordinator, coordination_key="client"
+    )
+    res = rowTable.output_result()
+
+    assert rowTable.superseded
+    assert "error" not in res
+    assert res["data"] == []
+    assert res["recordsTotal"] == "0"
+
+
+def test_draw_ends(session):
+    """Test if a finished draw is unregistered."""
+    coordinator = DrawCoordinator()
+    columns = [ColumnDT(User.id)]
+
+    query = session.query().select_from(User)
+
+    params = create_dt_params(columns)
+    res = DataTables(
+        params, query, columns, coordinator=coordinator, coordination_key="client"
+    ).output_result()
+
+    assert len(res["data"]) == 10
+    assert coordinator._tokens == {}
+
+
+def test_coordination_key_required(session):
+    """Test if a coordinator can't be used without a key."""
+    columns = [ColumnDT(User.id)]
+    params = create_dt_params(columns)
+
+    with pytest.raises(ValueError):
+        DataTables(params, session.query(), columns, coordinator=DrawCoordinator())
+
+
+def test_running_statement_cancelled(file_session):
+    """Test if the running statement of a superseded draw is cancelled."""
+    coordinator = DrawCoordinator()
+    # a cross join of 50 ** 5 rows, long enough to still run when cancelled
+    columns = [ColumnDT(func.count(User.id))]
+    query = file_session.query().select_from(User)
+    for _ in range(4):
+        alias = aliased(User)
+        query = query.join(alias, alias.id > 0)
+
+    params = create_dt_params(columns)
+    outputs = []
+
+    def draw():
+        outputs.append(
+            DataTables(
+                params,
+                query,
+                columns,
+                coordinator=coordinator,
+                coordination_key="client",
+            )
+        )
+
+    thread = threading.Thread(target=draw)
+    started = time.monotonic()
+    thread.start()
+    while not coordinator._tokens:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    coordinator.begin("client", 2)
+    thread.join()
+
+    assert outputs[0].superseded
+    assert time.monotonic() - started < 5
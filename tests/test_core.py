@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import func, select
+
+from datatables import ColumnDT, DataTables, DataTablesSpec
+
+from .helpers import create_dt_params
+from .models import Address, User
+
+
+def get_columns():
+    return [
+        ColumnDT(User.id, search_method="yadcf_range_number"),
+        ColumnDT(User.name, mData="name"),
+        ColumnDT(Address.description, search_method="yadcf_select"),
+        ColumnDT(User.birthday, search_method="date"),
+    ]
+
+
+def get_params(columns):
+    params = create_dt_params(
+        columns, search="e", length=5, order=[{"column": 1, "dir": "desc"}]
+    )
+    params["columns[3][search][value]"] = ">1970-02-01"
+    return params
+
+
+def test_core_same_output(session, engine):
+    """Test if a Core select gives the same output as the ORM query."""
+    columns = get_columns()
+    params = get_params(columns)
+
+    query = session.query().select_from(User).join(Address)
+    expected = DataTables(params, query, columns).output_result()
+
+    statement = select().select_from(User).join(Address)
+    with engine.connect() as connection:
+        res = DataTables(params, statement, columns, connection=connection)
+        assert res.output_result() == expected
+    res = DataTables(params, statement, columns, connection=engine)
+    assert res.output_result() == expected
+
+
+def test_core_group_by(engine):
+    """Test group by after a join select."""
+    columns = [ColumnDT(func.count(User.id)), ColumnDT(Address.id)]
+
+    statement = select().select_from(User).join(Address).group_by(Address.id)
+
+    params = create_dt_params(columns)
+    res = DataTables(params, statement, columns, connection=engine).output_result()
+
+    assert len(res["data"]) == 3
+    assert res["recordsTotal"] == "3"
+
+
+def test_core_executor(file_session, file_engine):
+    """Test if a Core select runs its statements concurrently."""
+    columns = get_columns()
+    params = get_params(columns)
+
+    query = file_session.query().select_from(User).join(Address)
+    expected = DataTables(params, query, columns).output_result()
+
+    statement = select().select_from(User).join(Address)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        res = DataTables(
+            params, statement, columns, connection=file_engine, executor=executor
+        )
+    assert res.output_result() == expected
+
+
+def test_core_spec(engine):
+    """Test if a spec of a Core select is executed on a connection."""
+    spec = DataTablesSpec(select().select_from(User), [ColumnDT(User.id)])
+
+    params = create_dt_params(spec.columns)
+    with engine.connect() as connection:
+        assert spec.execute(params, connection).counts() == (50, 50)
+
+
+def test_core_connection_required():
+    """Test if a connection is required with a select."""
+    columns = [ColumnDT(User.id)]
+    params = create_dt_params(columns)
+
+    with pytest.raises(ValueError):
+        DataTables(params, select().select_from(User), columns)
@@ -0,0 +1,227 @@
+import pytest
+from sqlalchemy import create_engine, delete, event
+from sqlalchemy.orm import Session
+
+from datatables import ColumnDT, CountRegistry, DataTables, joins
+
+from .helpers import create_dt_params
+from .models import Address, Base, User
+
+
+@pytest.fixture(scope="function")
+def registry():
+    registry = CountRegistry()
+
+    yield registry
+
+    registry.close()
+
+
+def get_total(session, tracked):
+    columns = [ColumnDT(User.id)]
+    query = session.query().select_from(User)
+    params = create_dt_params(columns)
+    res = DataTables(params, query, columns, tracked_count=tracked).output_result()
+    return res["recordsTotal"]
+
+
+def test_tracked_count_insert_delete(engine, session, registry):
+    """Test if the tracked count follows inserts and deletes."""
+    tracked = registry.track("users", User, engine)
+    assert get_total(session, tracked) == "50"
+
+    user51 = User(name="User 51")
+    session.add(user51)
+    session.flush()
+    assert tracked._count == 50
+
+    session.commit()
+    assert tracked._count == 51
+    assert get_total(session, tracked) == "51"
+
+    session.delete(user51)
+    session.commit()
+    assert get_total(session, tracked) == "50"
+
+
+def test_tracked_count_rollback(engine, session, registry):
+    """Test if rolled back changes are not counted."""
+    tracked = registry.track("users", User, engine)
+    assert get_total(session, tracked) == "50"
+
+    session.add(User(name="User 51"))
+    session.flush()
+    session.rollback()
+
+    assert tracked._count is None
+    assert get_total(session, tracked) == "50"
+
+
+def test_tracked_count_predicate(engine, session, registry):
+    """Test if only instances matching the predicate are counted."""
+    tracked = registry.track(
+        "named", User, engine, predicate=lambda u: u.name is not None
+    )
+    tracked.get(lambda: 50)
+
+    user51 = User(name="User 51")
+    user52 = User()
+    session.add_all([user51, user52])
+    session.commit()
+    assert tracked._count == 51
+
+    session.execute(delete(User).where(User.id == user52.id))
+    session.commit()
+    assert tracked._count is None
+
+    session.delete(user51)
+    session.commit()
+    assert get_total(session, tracked) == "50"
+
+
+def test_tracked_count_predicate_update(engine, session, registry):
+    """Test if updates moving rows in or out of the predicate are counted."""
+    tracked = registry.track(
+        "named", User, engine, predicate=lambda u: u.name is not None
+    )
+    user51 = User(name="User 51")
+    session.add(user51)
+    session.commit()
+    tracked.get(lambda: 51)
+    try:
+        assert user51.name == "User 51"
+        user51.name = None
+        session.commit()
+        assert tracked._count == 50
+
+        assert user51.name is None
+        user51.name = "User 51"
+        session.commit()
+        assert tracked._count == 51
+
+        # the previous name isn't known once expired by the commit
+        user51.name = "User 51 bis"
+        session.commit()
+        assert tracked._count is None
+    finally:
+        session.rollback()
+        session.delete(user51)
+        session.commit()
+
+
+def test_tracked_count_bulk_delete(engine, session, registry):
+    """Test if bulk deletes are subtracted from the count."""
+    tracked = registry.track("users", User, engine)
+    session.add_all([User(name="User 51"), User(name="User 52")])
+    session.commit()
+    assert get_total(session, tracked) == "52"
+
+    session.execute(delete(User).where(User.id > 50))
+    session.commit()
+    assert tracked._count == 50
+
+
+def test_tracked_count_bulk_methods(engine, session, registry):
+    """Test if the bulk methods of the session invalidate the count."""
+    tracked = registry.track("users", User, engine)
+    assert get_total(session, tracked) == "50"
+    try:
+        session.bulk_insert_mappings(User, [{"name": "User 51"}])
+        session.commit()
+        assert tracked._count is None
+        assert get_total(session, tracked) == "51"
+
+        session.bulk_save_objects([User(name="User 52")])
+        session.commit()
+        assert tracked._count is None
+        assert get_total(session, tracked) == "52"
+    finally:
+        session.rollback()
+        session.execute(delete(User).where(User.id > 50))
+        session.commit()
+
+
+def test_tracked_count_other_database(engine, session, registry):
+    """Test if writes to another database don't change the count."""
+    tracked = registry.track("users", User, engine)
+    assert get_total(session, tracked) == "50"
+    other = create_engine("sqlite://")
+    Base.metadata.create_all(other)
+
+    with Session(other) as other_session:
+        other_session.add(User(name="User 51"))
+        other_session.bulk_insert_mappings(User, [{"name": "User 52"}])
+        other_session.commit()
+        other_session.execute(delete(User))
+        other_session.commit()
+
+    assert tracked._count == 50
+
+
+def test_tracked_count_reconcile(engine, session, registry):
+    """Test if the count is counted again once too old."""
+    tracked = registry.track("users", User, engine, reconcile_every=0)
+    tracked.get(lambda: 1000)
+
+    assert get_total(session, tracked) == "50"
+
+
+def test_track_twice(engine, registry):
+    """Test if a name can only be tracked once."""
+    registry.track("users", User, engine)
+    with pytest.raises(ValueError):
+        registry.track("users", User, engine)
+
+
+def test_count_prunes_joins(session):
+    """Test if the counts leave out joins which can't change them."""
+    columns = [ColumnDT(Address.id), ColumnDT(User.name)]
+    query = session.query().select_from(Address).outerjoin(User)
+    statements = []
+    engine = session.get_bind()
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        table = DataTables(create_dt_params(columns), query, columns, lazy=True)
+        assert table.counts() == (3, 3)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(statements) == 2
+    assert not any("JOIN" in statement for statement in statements)
+
+
+def test_count_keeps_filtered_joins(session):
+    """Test if the filtered count keeps the joins of the filters."""
+    columns = [ColumnDT(Address.id), ColumnDT(User.name)]
+    query = session.query().select_from(Address).outerjoin(User)
+    params = create_dt_params(columns)
+    params["columns[1][search][value]"] = "no such user"
+
+    table = DataTables(params, query, columns, lazy=True)
+
+    assert table.counts() == (3, 0)
+
+
+def test_count_unknown_joins(session, monkeypatch):
+    """Test if the counts keep the joins when they can't be analyzed."""
+    columns = [ColumnDT(Address.id), ColumnDT(User.name)]
+    query = session.query().select_from(Address).outerjoin(User)
+
+    def analyze(statement):
+        raise AttributeError("_setup_joins")
+
+    monkeypatch.setattr(joins, "_analyze_joins", analyze)
+    statements = []
+    engine = session.get_bind()
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        table = DataTables(create_dt_params(columns), query, columns, lazy=True)
+        assert table.counts() == (3, 3)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert all("JOIN" in statement for statement in statements)
@@ -0,0 +1,100 @@
+import datetime
+import json
+
+import pytest
+
+from datatables import ColumnDT, DataTables
+
+from .helpers import create_dt_params
+from .models import User
+
+
+def get_columns():
+    return [
+        ColumnDT(User.id, mData="id"),
+        ColumnDT(User.name, mData="name"),
+        ColumnDT(User.created_at, mData="created_at"),
+    ]
+
+
+def get_output(session, previous=None, **kwargs):
+    columns = get_columns()
+    params = create_dt_params(columns, **kwargs)
+    if previous is not None:
+        params["delta[window]"] = previous["delta"]["window"]
+        params["delta[watermark]"] = previous["delta"]["watermark"]
+        params["delta[keys]"] = json.dumps(previous["delta"]["keys"])
+    query = session.query().select_from(User)
+    return DataTables(
+        params, query, columns, key_column="id", version_column="created_at"
+    ).output_result()
+
+
+def test_first_draw_is_full(session):
+    """Test if a draw without watermark sends the full page."""
+    res = get_output(session)
+
+    assert res["delta"]["full"]
+    assert [row["id"] for row in res["data"]] == res["delta"]["keys"]
+    assert len(res["data"]) == 10
+    assert res["delta"]["watermark"]
+
+
+def test_unchanged_page(session):
+    """Test if a delta draw of an unchanged page sends no rows."""
+    first = get_output(session)
+
+    res = get_output(session, first)
+
+    assert not res["delta"]["full"]
+    assert res["data"] == []
+    assert res["delta"]["removed"] == []
+    assert res["delta"]["keys"] == first["delta"]["keys"]
+    assert res["recordsTotal"] == "50"
+
+
+def test_changed_rows(session):
+    """Test if a delta draw sends the rows changed since the watermark."""
+    first = get_output(session)
+    user = session.get(User, 3)
+    created_at = user.created_at
+    user.created_at = created_at + datetime.timedelta(days=1)
+    session.commit()
+    try:
+        res = get_output(session, first)
+    finally:
+        user.created_at = created_at
+        session.commit()
+
+    assert [row["id"] for row in res["data"]] == [3]
+    assert res["delta"]["watermark"] > first["delta"]["watermark"]
+
+
+def test_removed_keys(session):
+    """Test if keys which left the page are sent as removed."""
+    first = get_output(session)
+    first["delta"]["keys"] = [99] + first["delta"]["keys"][1:]
+
+    res = get_output(session, first)
+
+    assert res["delta"]["removed"] == [99]
+    assert [row["id"] for row in res["data"]] == [1]
+
+
+def test_shifted_window(session):
+    """Test if a draw of another page sends the full page."""
+    first = get_output(session)
+
+    res = get_output(session, first, start=10)
+
+    assert res["delta"]["full"]
+    assert [row["id"] for row in res["data"]] == list(range(11, 21))
+
+
+def test_version_column_requires_key(session):
+    """Test if a version column requires a key column."""
+    columns = get_columns()
+    query = session.query().select_from(User)
+
+    with pytest.raises(ValueError):
+        DataTables(create_dt_params(columns), query, columns, version_column="id")
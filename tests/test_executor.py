@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import func
+
+from datatables import ColumnDT, DataTables
+
+from .helpers import create_dt_params
+from .models import Address, User
+
+
+@pytest.fixture(scope="module")
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        yield executor
+
+
+def test_executor_same_output(file_session, executor):
+    """Test if running the statements concurrently gives the same output."""
+    columns = [
+        ColumnDT(User.id, search_method="yadcf_range_number"),
+        ColumnDT(User.name),
+        ColumnDT(Address.description, search_method="yadcf_select"),
+    ]
+
+    query = file_session.query().select_from(User).join(Address)
+
+    params = create_dt_params(columns, search="e", length=20)
+    params["columns[2][search][value]"] = "Road"
+    expected = DataTables(params, query, columns).output_result()
+    res = DataTables(params, query, columns, executor=executor).output_result()
+
+    assert "error" not in res
+    assert res == expected
+    assert list(res)[-2:] == ["yadcf_data_0", "yadcf_data_2"]
+
+
+def test_executor_error(file_session, executor):
+    """Test if an error in a statement is reported in the output."""
+    columns = [ColumnDT(User.id)]
+
+    query = file_session.query().select_from(User)
+
+    params = create_dt_params(columns, length=-10)
+    res = DataTables(params, query, columns, executor=executor).output_result()
+
+    assert "Length should be" in res["error"]
+
+    columns = [ColumnDT(User.id), ColumnDT(func.no_such_function(User.id))]
+
+    params = create_dt_params(columns)
+    res = DataTables(params, query, columns, executor=executor).output_result()
+
+    assert "no such function" in res["error"]
@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+
+import pytest
+from sqlalchemy import select
+
+from datatables import ColumnDT, DataTables
+from datatables.export import iter_export, write_export
+
+from .helpers import create_dt_params
+from .models import Address, User
+
+
+def get_table(session, **kwargs):
+    columns = [
+        ColumnDT(User.id, mData="id", search_method="numeric"),
+        ColumnDT(Address.description, mData="address"),
+    ]
+    query = session.query().select_from(User).join(Address)
+    params = create_dt_params(columns, order=[{"column": 0, "dir": "desc"}])
+    params["columns[0][search][value]"] = ">1"
+    params.update(kwargs)
+    return DataTables(params, query, columns, lazy=True)
+
+
+def expected_rows(session):
+    query = session.query(User.id, Address.description).join(Address)
+    return query.filter(User.id > 1).order_by(User.id.desc()).all()
+
+
+def test_export_csv(session):
+    """Test if the filtered and sorted rows are exported without paging."""
+    chunks = list(iter_export(get_table(session, length="1"), chunk_size=1))
+
+    assert len(chunks) == 3
+    rows = list(csv.reader(io.StringIO("".join(chunks))))
+    assert rows == [["id", "address"]] + [
+        [str(i), d] for i, d in expected_rows(session)
+    ]
+
+
+def test_export_ndjson(session):
+    """Test if rows are exported as one JSON object per line."""
+    text = "".join(iter_export(get_table(session), fmt="ndjson"))
+
+    lines = [json.loads(line) for line in text.splitlines()]
+    assert lines == [{"id": i, "address": d} for i, d in expected_rows(session)]
+
+
+def test_export_max_rows_progress(session):
+    """Test if exports are capped and report their progress."""
+    output = io.StringIO()
+    progress = []
+    written = write_export(
+        get_table(session), output, chunk_size=1, max_rows=1, progress=progress.append
+    )
+
+    assert written == 1
+    assert progress == [1]
+    i, d = expected_rows(session)[0]
+    assert output.getvalue().splitlines() == ["id,address", "{},{}".format(i, d)]
+
+
+def test_export_empty(session):
+    """Test if an empty export still has its header."""
+    table = get_table(session, **{"columns[0][search][value]": ">100"})
+
+    assert "".join(iter_export(table)).splitlines() == ["id,address"]
+    assert "".join(iter_export(table, fmt="ndjson")) == ""
+
+
+def test_export_invalid_format(session):
+    """Test if unknown formats are rejected."""
+    with pytest.raises(ValueError):
+        list(iter_export(get_table(session), fmt="xml"))
+
+
+def test_export_core(session, engine):
+    """Test if a Core select is exported the same way."""
+    table = get_table(session)
+    statement = select().select_from(User).join(Address)
+    core_table = DataTables(
+        table.params, statement, table.columns, lazy=True, connection=engine
+    )
+
+    assert list(iter_export(core_table)) == list(iter_export(table))
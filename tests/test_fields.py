@@ -126,20 +126,50 @@ def test_fields_global_search_filtering_with_regex(session):
 
     query = session.query().select_from(User)
 
+    params = create_dt_params(columns, search="Run To|Feeeeear")
+    params["search[regex]"] = "true"
+
+    rowTable = DataTables(params, query, columns, allow_regex_searches=True)
+    res = rowTable.output_result()
+
+    assert len(res["data"]) == 2
+    assert res["recordsTotal"] == "52"
+    assert res["recordsFiltered"] == "2"
+    assert {row["1"] for row in res["data"]} == {"Run To", "Feeeeear Of"}
+
+
+@pytest.mark.usefixtures("fixtures_fields_global_search_filtering_with_regex")
+def test_fields_global_search_regex_special_characters(session):
+    """Test if regex special characters other than alternation are literal."""
+    columns = [ColumnDT(User.id), ColumnDT(User.name)]
+
+    query = session.query().select_from(User)
+
     params = create_dt_params(columns, search="Fe*ar")
     params["search[regex]"] = "true"
 
     rowTable = DataTables(params, query, columns, allow_regex_searches=True)
     res = rowTable.output_result()
 
-    if "error" in res:
-        # unfortunately sqlite doesn't support regexp out of the box'
-        assert "no such function: REGEXP" in res["error"]
-    else:
-        assert len(res["data"]) == 1
-        assert res["recordsTotal"] == "1"
-        assert res["recordsFiltered"] == "1"
-        assert res["data"][0]["1"] == "Feeeeear Of"
+    assert "error" not in res
+    assert res["recordsFiltered"] == "0"
+
+
+@pytest.mark.usefixtures("fixtures_fields_global_search_filtering_with_regex")
+def test_fields_global_search_regex_any_dialect(session):
+    """Test if regex searches compile to LIKE, which every dialect supports."""
+    columns = [ColumnDT(User.id), ColumnDT(User.name)]
+
+    query = session.query().select_from(User)
+
+    params = create_dt_params(columns, search="Run|Of")
+    params["search[regex]"] = "true"
+
+    rowTable = DataTables(params, query, columns, allow_regex_searches=True, lazy=True)
+    sql = str(rowTable.rows_query().statement)
+
+    assert "REGEXP" not in sql
+    assert sql.count("LIKE") == 4
 
 
 @pytest.fixture(scope="function")
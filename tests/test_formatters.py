@@ -0,0 +1,141 @@
+import io
+
+import pytest
+from sqlalchemy import Float, Numeric, column, literal_column
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from datatables import ColumnDT, DataTables
+from datatables.export import write_export
+from datatables.formatters import DateFormatter, RoundFormatter
+
+from .helpers import create_dt_params
+from .models import User
+
+
+def get_result(session, columns, **kwargs):
+    params = create_dt_params(columns, **kwargs)
+    query = session.query().select_from(User)
+    return DataTables(params, query, columns).output_result()
+
+
+def test_formatter_pushed_down(session):
+    """Test if a formatter supported by the dialect is compiled to SQL."""
+    columns = [
+        ColumnDT(User.id, mData="id"),
+        ColumnDT(User.birthday, mData="birthday", formatter=DateFormatter("%d-%m-%Y")),
+    ]
+    user = session.query(User).filter(User.birthday.isnot(None)).first()
+
+    res = get_result(session, columns, search=user.birthday.isoformat(), length=-1)
+
+    row = [r for r in res["data"] if r["id"] == user.id][0]
+    assert row["birthday"] == user.birthday.strftime("%d-%m-%Y")
+
+
+def test_date_formatter_unsupported_directive(session):
+    """Test if dates are formatted in python with directives SQLite lacks."""
+    columns = [
+        ColumnDT(User.id, mData="id"),
+        ColumnDT(User.birthday, mData="birthday", formatter=DateFormatter("%d %b %y")),
+    ]
+    user = session.query(User).filter(User.birthday.isnot(None)).first()
+
+    res = get_result(session, columns, length=-1)
+
+    row = [r for r in res["data"] if r["id"] == user.id][0]
+    assert row["birthday"] == user.birthday.strftime("%d %b %y")
+
+
+def test_formatter_python_fallback(session):
+    """Test if python formatters are applied to the fetched values."""
+    columns = [
+        ColumnDT(User.id, mData="id"),
+        ColumnDT(User.name, mData="name", formatter=str.upper),
+    ]
+
+    res = get_result(session, columns, order=[{"column": 1, "dir": "asc"}])
+
+    names = [name for (name,) in session.query(User.name).order_by(User.name)]
+    assert [r["name"] for r in res["data"]] == [n.upper() for n in names[:10]]
+
+
+def test_formatter_sorts_raw_values(session):
+    """Test if columns are sorted by their raw values, not formatted ones."""
+    columns = [
+        ColumnDT(User.id, mData="id"),
+        ColumnDT(User.birthday, mData="birthday", formatter=DateFormatter("%d/%m/%Y")),
+    ]
+
+    res = get_result(session, columns, order=[{"column": 1, "dir": "desc"}])
+
+    query = session.query(User.id).order_by(User.birthday.desc())
+    assert [r["id"] for r in res["data"]] == [i for (i,) in query.limit(10)]
+
+
+def test_formatter_export(session):
+    """Test if exported rows are formatted."""
+    columns = [ColumnDT(User.name, mData="name", formatter=lambda v: v[:1])]
+    params = create_dt_params(columns, length=1)
+    table = DataTables(params, session.query().select_from(User), columns, lazy=True)
+    output = io.StringIO()
+
+    write_export(table, output)
+
+    lines = output.getvalue().splitlines()
+    assert lines[0] == "name"
+    assert all(len(line) == 1 for line in lines[1:])
+
+
+@pytest.mark.parametrize(
+    ("dialect", "expected"),
+    [
+        (sqlite.dialect(), "strftime("),
+        (postgresql.dialect(), "to_char(users.birthday"),
+        (mysql.dialect(), "date_format(users.birthday"),
+    ],
+)
+def test_date_formatter_sql(dialect, expected):
+    """Test if date formatters compile to the function of each dialect."""
+    expr = DateFormatter("%d-%m-%Y %H:%M").sql(User.birthday, dialect)
+
+    assert str(expr.compile(dialect=dialect)).startswith(expected)
+
+
+def test_date_formatter_patterns():
+    """Test if strftime formats are translated for each dialect."""
+    formatter = DateFormatter("%d at %H:%M")
+
+    pg = formatter.sql(User.birthday, postgresql.dialect())
+    my = formatter.sql(User.birthday, mysql.dialect())
+
+    assert pg.clauses.clauses[1].value == 'DD" at "HH24:MI'
+    assert my.clauses.clauses[1].value == "%d at %H:%i"
+    assert DateFormatter("%A").sql(User.birthday, postgresql.dialect()) is None
+    assert DateFormatter("%d %b %y").sql(User.birthday, sqlite.dialect()) is None
+
+
+def test_round_formatter():
+    """Test if numbers are rounded by python when not pushed down."""
+    assert RoundFormatter(1).format([1.26, None, 2]) == [1.3, None, 2]
+
+
+def test_round_formatter_postgresql():
+    """Test if PostgreSQL rounds floats as numeric, and untyped values in python."""
+    dialect = postgresql.dialect()
+    formatter = RoundFormatter(2)
+
+    expr = formatter.sql(column("x", Float), dialect)
+    exact = formatter.sql(column("x", Numeric), dialect)
+
+    assert str(expr.compile(dialect=dialect)).startswith(
+        "CAST(round(CAST(x AS NUMERIC), "
+    )
+    assert str(exact.compile(dialect=dialect)).startswith("round(x, ")
+    assert formatter.sql(literal_column("x"), dialect) is None
+    assert formatter.sql(literal_column("x"), sqlite.dialect()) is not None
+
+
+def test_invalid_formatter():
+    """Test if formatters should be callable."""
+    with pytest.raises(ValueError):
+        ColumnDT(User.name, formatter="upper")
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from datatables import ColumnDT, DataTables
+
+from .helpers import create_dt_params
+from .models import User
+
+
+def get_table(session, length=-1, **kwargs):
+    columns = [ColumnDT(User.id, mData="id"), ColumnDT(User.name, mData="name")]
+    params = create_dt_params(columns, length=length)
+    query = session.query().select_from(User)
+    return DataTables(params, query, columns, **kwargs)
+
+
+def test_max_length_truncate(session):
+    """Test if pages longer than max_length are truncated."""
+    table = get_table(session, max_length=5)
+    res = table.output_result()
+
+    assert len(res["data"]) == 5
+    assert res["truncated"] is True
+    assert res["recordsFiltered"] == "50"
+
+
+def test_max_length_reject(session):
+    """Test if pages longer than max_length can be rejected."""
+    res = get_table(session, max_length=5, on_limit="reject").output_result()
+
+    assert "error" in res
+    assert "length of 5" in res["error"]
+
+
+def test_max_length_under(session):
+    """Test if pages within the limits are not flagged."""
+    res = get_table(session, length=5, max_length=5, max_rows=5).output_result()
+
+    assert len(res["data"]) == 5
+    assert "truncated" not in res
+
+
+def test_max_rows_truncate(session):
+    """Test if materialized rows are capped by max_rows."""
+    table = get_table(session, max_rows=7)
+    res = table.output_result()
+
+    assert len(res["data"]) == 7
+    assert res["truncated"] is True
+    assert table.materialized_bytes > 0
+
+
+def test_max_bytes_reject(session):
+    """Test if pages over the byte budget can be rejected."""
+    res = get_table(session, max_bytes=1000, on_limit="reject").output_result()
+
+    assert "1000 bytes" in res["error"]
+
+
+def test_max_bytes_truncate(session):
+    """Test if the materialized rows stay within the byte budget."""
+    table = get_table(session, max_bytes=2000)
+    res = table.output_result()
+
+    assert 0 < len(res["data"]) < 50
+    assert table.materialized_bytes <= 2000
+
+
+def test_max_rows_stream(session):
+    """Test if pages over the limits can be streamed instead."""
+    table = get_table(session, max_rows=10, on_limit="stream")
+    res = table.output_result()
+
+    assert table.streaming is True
+    assert res["data"] == []
+
+    output = json.loads("".join(table.iter_output(chunk_size=7)))
+    ids = [i for (i,) in session.query(User.id).order_by(User.id)]
+    assert [r["id"] for r in output["data"]] == ids
+    assert output["recordsTotal"] == "50"
+
+
+def test_iter_output_without_streaming(session):
+    """Test if iter_output outputs materialized pages as one chunk."""
+    table = get_table(session, length=3)
+
+    chunks = list(table.iter_output())
+
+    assert len(chunks) == 1
+    assert json.loads(chunks[0]) == json.loads(json.dumps(table.output_result()))
+
+
+def test_materialized_bytes(session):
+    """Test if the size of the materialized rows is reported."""
+    table = get_table(session, length=10)
+    small = table.materialized_bytes
+    table = get_table(session, length=20)
+
+    assert 0 < small < table.materialized_bytes
+
+
+def test_invalid_on_limit(session):
+    """Test if on_limit should be an allowed action."""
+    with pytest.raises(ValueError):
+        get_table(session, on_limit="ignore")
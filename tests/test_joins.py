@@ -0,0 +1,83 @@
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, String, Table, select
+from sqlalchemy.orm import configure_mappers
+
+from datatables.core import CoreQuery
+from datatables.joins import prune_joins
+
+from .models import Address, User
+
+metadata = MetaData()
+
+countries = Table(
+    "countries",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String),
+)
+
+cities = Table(
+    "cities",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("country_id", Integer, ForeignKey("countries.id"), nullable=False),
+    Column("name", String),
+)
+
+
+def joined(query):
+    return "JOIN" in str(query.add_columns(Address.id).statement)
+
+
+def test_prune_outer_many_to_one(session):
+    """Test if an unreferenced outer join to one row is pruned."""
+    query = session.query().select_from(Address).outerjoin(User)
+
+    assert not joined(prune_joins(query, [Address.id]))
+    assert joined(prune_joins(query, [User.name]))
+
+
+def test_prune_relationship(session):
+    """Test if an unreferenced outer join of a relationship is pruned."""
+    configure_mappers()
+    query = session.query().select_from(Address).outerjoin(Address.user)
+
+    assert not joined(prune_joins(query, [Address.id]))
+
+
+def test_keep_filtering_joins(session):
+    """Test if joins which can drop or multiply the rows are kept."""
+    # addresses.user_id is nullable
+    query = session.query().select_from(Address).join(User)
+    assert joined(prune_joins(query, [Address.id]))
+
+    # a user has many addresses
+    query = session.query().select_from(User).outerjoin(Address)
+    assert joined(prune_joins(query, [User.id]))
+
+
+def test_keep_referenced_joins(session):
+    """Test if joins referenced by the criteria of the query are kept."""
+    query = session.query().select_from(Address).outerjoin(User)
+
+    assert joined(prune_joins(query.filter(User.name == "a"), [Address.id]))
+    assert joined(prune_joins(query.order_by(User.name), [Address.id]))
+
+
+def test_prune_inner_non_null_foreign_key(engine):
+    """Test if an inner join through a non-null foreign key is pruned."""
+    statement = select().select_from(cities).join(countries)
+    query = CoreQuery(statement, engine)
+
+    pruned = prune_joins(query, [cities.c.name])
+
+    assert "JOIN" not in str(pruned.add_columns(cities.c.name).statement)
+    assert prune_joins(query, [countries.c.name]) is query
+
+
+def test_prune_unknown_statement_shape(session):
+    """Test if a statement of an unexpected shape is returned unchanged."""
+    query = session.query().select_from(Address).outerjoin(User)
+    # a join setup of another SQLAlchemy version
+    query._setup_joins = tuple(setup + (None,) for setup in query._setup_joins)
+
+    assert prune_joins(query, [Address.id]) is query
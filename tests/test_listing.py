@@ -162,3 +162,17 @@ def test_list_specific_page(session):
     assert res["recordsFiltered"] == "52"
     assert res["data"][0]["0"] == 51
     assert res["data"][1]["0"] == 52
+
+
+def test_list_hidden_column(session):
+    """Test if columns hidden by the client are neither selected nor joined."""
+    columns = [ColumnDT(Address.id), ColumnDT(User.name)]
+    query = session.query().select_from(Address).outerjoin(User)
+    params = create_dt_params(columns)
+    params["columns[1][visible]"] = "false"
+
+    rowTable = DataTables(params, query, columns, lazy=True)
+    statement = str(rowTable.rows_query().statement)
+
+    assert "JOIN" not in statement
+    assert [row["1"] for row in rowTable.page()] == [None, None, None]
@@ -0,0 +1,135 @@
+import pytest
+
+from datatables import ColumnDT, DataTables
+
+from .helpers import create_dt_params
+from .models import Address, User
+
+pytest.importorskip("numpy")
+
+from datatables.numpy_engine import NumpyTable  # noqa: E402
+
+
+def get_columns():
+    return [
+        ColumnDT(User.id, mData="id", search_method="numeric"),
+        ColumnDT(User.name, mData="name"),
+        ColumnDT(Address.description, mData="address", search_method="yadcf_select"),
+        ColumnDT(User.birthday, mData="birthday", search_method="yadcf_range_date"),
+        ColumnDT(User.id, mData="slider", search_method="yadcf_range_number_slider"),
+    ]
+
+
+def get_query(session):
+    return session.query().select_from(User).outerjoin(User.address)
+
+
+def unordered(output):
+    """Sort the distinct values of yadcf data, which are in no SQL order."""
+    return {
+        k: sorted(v, key=str) if isinstance(v, list) and k != "data" else v
+        for k, v in output.items()
+    }
+
+
+def compare(session, table, params):
+    """Check the output of the in-memory table against the database."""
+    columns = get_columns()
+    expected = DataTables(params, get_query(session), columns).output_result()
+    output = table.output_result(params)
+    assert unordered(output) == unordered(expected)
+    return output
+
+
+@pytest.fixture
+def table(session):
+    return NumpyTable(get_query(session), get_columns())
+
+
+def test_numpy_paging_sorting(session, table):
+    """Test if pages and sorts are the ones of the database."""
+    output = compare(session, table, create_dt_params(get_columns()))
+    assert len(output["data"]) == 10
+
+    params = create_dt_params(
+        get_columns(), start=10, order=[{"column": 1, "dir": "desc"}]
+    )
+    compare(session, table, params)
+
+
+def test_numpy_nulls_sorting(session, table):
+    """Test if NULLs sort as in the database."""
+    columns = get_columns()
+    for direction in ["asc", "desc"]:
+        params = create_dt_params(
+            columns,
+            order=[{"column": 2, "dir": direction}, {"column": 0, "dir": "asc"}],
+        )
+        compare(session, table, params)
+
+
+@pytest.mark.parametrize(
+    "search",
+    [
+        {"columns[0][search][value]": ">=25"},
+        {"columns[0][search][value]": "abc"},
+        {"columns[2][search][value]": "oad"},
+        {"columns[3][search][value]": "1970-03-01-yadcf_delim-1970-06-01"},
+        {"columns[3][search][value]": "-yadcf_delim-1970-02-01"},
+        {"search[value]": "an"},
+        {"search[value]": "1970-01"},
+    ],
+)
+def test_numpy_searches(session, table, search):
+    """Test if searches select the rows of the database."""
+    columns = get_columns()
+    params = dict(create_dt_params(columns, length=-1), **search)
+
+    compare(session, table, params)
+
+
+def test_numpy_regex_search(session):
+    """Test if regex global searches are evaluated with python regexes."""
+    columns = get_columns()
+    params = create_dt_params(columns, search="Road|Avenue", length=-1)
+    params["search[regex]"] = "true"
+    table = NumpyTable(get_query(session), columns, allow_regex_searches=True)
+
+    output = table.output_result(params)
+
+    assert {r["address"] for r in output["data"]} >= {"Road", "Avenue"}
+    assert "Street" not in {r["address"] for r in output["data"]}
+
+
+def test_numpy_invalidate(session, table):
+    """Test if the arrays are reloaded after invalidation only."""
+    table.output_result(create_dt_params(get_columns()))
+    user = User(name="In memory user")
+    session.add(user)
+    session.commit()
+    try:
+        params = create_dt_params(get_columns())
+        assert table.output_result(params)["recordsTotal"] == "50"
+
+        table.invalidate()
+
+        assert table.output_result(params)["recordsTotal"] == "51"
+    finally:
+        session.delete(user)
+        session.commit()
+
+
+def test_numpy_error(table):
+    """Test if invalid requests output an error."""
+    params = create_dt_params(get_columns())
+    params["length"] = "-2"
+
+    assert "error" in table.output_result(params)
+
+
+def test_numpy_related_columns(session):
+    """Test if related columns are refused."""
+    columns = [ColumnDT(Address.description, related=User.address)]
+
+    with pytest.raises(ValueError):
+        NumpyTable(session.query().select_from(User), columns)
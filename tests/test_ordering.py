@@ -129,3 +129,17 @@ def test_ordering_relation(session):
 
     assert res["data"][0]["1"] == "UserFirstAddress"
     assert res["data"][0]["2"] == "000_Address"
+
+
+def test_ordering_not_orderable(session):
+    """Test if sorts on columns not orderable by the client are ignored."""
+    columns = [ColumnDT(User.id), ColumnDT(User.name)]
+    query = session.query().select_from(User)
+    params = create_dt_params(
+        columns, order=[{"column": 1, "dir": "desc"}, {"column": 0, "dir": "desc"}]
+    )
+    params["columns[1][orderable]"] = "false"
+
+    res = DataTables(params, query, columns).output_result()
+
+    assert res["data"][0]["0"] == 50
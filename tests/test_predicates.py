@@ -0,0 +1,81 @@
+import datetime
+
+import pytest
+
+from datatables.clean_regex import clean_regex, literal_alternatives
+from datatables.predicates import (
+    coerce_date,
+    coerce_number,
+    coerce_value,
+    contains,
+    starts_with,
+)
+from datatables.search_methods import SEARCH_METHODS
+
+from .models import User
+
+
+def compile_(expr):
+    return str(expr.compile(compile_kwargs={"literal_binds": True}))
+
+
+def test_range_number_open():
+    """Test if open ranges compile to single-sided comparisons."""
+    range_number = SEARCH_METHODS["yadcf_range_number"]
+
+    assert compile_(range_number(User.id, "10-yadcf_delim-")) == "users.id >= 10"
+    assert compile_(range_number(User.id, "-yadcf_delim-10")) == "users.id <= 10"
+    assert range_number(User.id, "-yadcf_delim-") is None
+    assert (
+        compile_(range_number(User.id, "1.5-yadcf_delim-9.5"))
+        == "users.id BETWEEN 2 AND 9"
+    )
+
+
+def test_range_date_open():
+    """Test if open date ranges compile to single-sided comparisons."""
+    range_date = SEARCH_METHODS["yadcf_range_date"]
+
+    assert (
+        compile_(range_date(User.birthday, "1970-01-03-yadcf_delim-"))
+        == "users.birthday >= '1970-01-03'"
+    )
+    assert range_date(User.birthday, "-yadcf_delim-") is None
+
+
+def test_string_contains_non_string():
+    """Test if non string expressions are explicitly cast."""
+    string_contains = SEARCH_METHODS["string_contains"]
+
+    assert "CAST(users.id AS TEXT)" in compile_(string_contains(User.id, "1"))
+    assert "CAST" not in compile_(string_contains(User.name, "a"))
+
+
+def test_coerce():
+    """Test if search values are coerced to the type of the expression."""
+    assert coerce_number(User.id, "10") == 10
+    assert isinstance(coerce_number(User.id, "10"), int)
+    assert coerce_number(User.id, "10.5") == 10.5
+    assert coerce_date(User.birthday, "1970-01-03") == datetime.date(1970, 1, 3)
+    assert coerce_date(User.created_at, "1970-01-03") == datetime.datetime(1970, 1, 3)
+    assert coerce_value(User.name, "10") == "10"
+    with pytest.raises(ValueError):
+        coerce_value(User.id, "abc")
+
+
+def test_starts_with():
+    """Test if prefixes compile to constant LIKE patterns, wildcards escaped."""
+    assert compile_(starts_with(User.name, "a_b%")) == (
+        "users.name LIKE 'a/_b/%%' ESCAPE '/'"
+    )
+    assert compile_(starts_with(User.id, "1")) == (
+        "CAST(users.id AS TEXT) LIKE '1%' ESCAPE '/'"
+    )
+
+
+def test_literal_alternatives():
+    """Test if cleaned regexes split into their unescaped alternatives."""
+    assert literal_alternatives(clean_regex("a.b|c*|d\\e")) == ["a.b", "c*", "de"]
+    assert compile_(contains(User.name, "5%")) == (
+        "users.name LIKE '%5/%%' ESCAPE '/'"
+    )
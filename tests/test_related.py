@@ -0,0 +1,171 @@
+import pytest
+from sqlalchemy import Column, ForeignKey, Integer, String, create_engine, event, select
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+
+from datatables import ColumnDT, DataTables
+
+from .helpers import create_dt_params
+
+Base = declarative_base()
+
+
+class Author(Base):
+    __tablename__ = "related_authors"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    books = relationship("Book", order_by="Book.id")
+
+
+class Book(Base):
+    __tablename__ = "related_books"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String)
+    pages = Column(Integer)
+    author_id = Column(Integer, ForeignKey("related_authors.id"))
+    author = relationship("Author", viewonly=True)
+
+
+@pytest.fixture(scope="module")
+def related_session():
+    engine = create_engine("sqlite:///")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all(
+        [
+            Author(
+                name="Hugo",
+                books=[Book(title="Les Misérables", pages=1400), Book(title="Hernani")],
+            ),
+            Author(name="Zola", books=[Book(title="Germinal", pages=600)]),
+            Author(name="Camus", books=[Book(title="La Peste", pages=300)]),
+            Author(name="Anonymous"),
+        ]
+    )
+    session.commit()
+
+    yield session
+
+    session.close()
+
+
+def get_columns():
+    return [
+        ColumnDT(Author.id, mData="id"),
+        ColumnDT(Author.name, mData="name"),
+        ColumnDT(Book.title, mData="titles", related=Author.books),
+        ColumnDT(
+            Book.pages, mData="pages", related=Author.books, search_method="numeric"
+        ),
+    ]
+
+
+def get_result(session, search="", **kwargs):
+    columns = get_columns()
+    params = create_dt_params(columns, search=search)
+    params.update(kwargs)
+    query = session.query().select_from(Author)
+    return DataTables(params, query, columns).output_result()
+
+
+def test_related_columns_are_not_joined(related_session):
+    """Test if related columns don't multiply the rows of the base query."""
+    res = get_result(related_session)
+
+    assert res["recordsTotal"] == "4"
+    assert res["recordsFiltered"] == "4"
+    titles = {r["name"]: r["titles"] for r in res["data"]}
+    assert sorted(titles["Hugo"].split(", ")) == ["Hernani", "Les Misérables"]
+    assert titles["Anonymous"] is None
+
+
+def test_related_global_search(related_session):
+    """Test if the global search matches authors through their books."""
+    res = get_result(related_session, search="her")
+
+    assert res["recordsFiltered"] == "1"
+    assert [r["name"] for r in res["data"]] == ["Hugo"]
+
+
+def test_related_column_search(related_session):
+    """Test if column searches compile to EXISTS subqueries."""
+    statements = []
+    engine = related_session.get_bind()
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        res = get_result(related_session, **{"columns[3][search][value]": ">=500"})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert sorted(r["name"] for r in res["data"]) == ["Hugo", "Zola"]
+    assert res["recordsFiltered"] == "2"
+    assert all("JOIN" not in s for s in statements)
+    assert any("EXISTS" in s for s in statements)
+
+
+def test_related_sort(related_session):
+    """Test if related columns sort by their values."""
+    res = get_result(
+        related_session, **{"order[0][column]": "2", "order[0][dir]": "asc"}
+    )
+
+    titles = [r["titles"] for r in res["data"]]
+    assert titles[0] is None
+    assert titles[1:] == sorted(titles[1:])
+
+
+def test_related_yadcf_range(related_session):
+    """Test if yadcf ranges of related columns span the related values."""
+    columns = [
+        ColumnDT(Author.name, mData="name"),
+        ColumnDT(
+            Book.pages, related=Author.books, search_method="yadcf_range_number_slider"
+        ),
+    ]
+    params = create_dt_params(columns)
+    query = related_session.query().select_from(Author)
+
+    res = DataTables(params, query, columns).output_result()
+
+    assert res["yadcf_data_1"] == (300, 1400)
+    assert res["recordsTotal"] == "4"
+
+
+def test_related_core_select(related_session):
+    """Test if related columns work with Core select statements."""
+    columns = [
+        ColumnDT(Author.name, mData="name"),
+        ColumnDT(Book.pages, related=Author.books, search_method="yadcf_select"),
+    ]
+    columns.append(ColumnDT(Book.title, related=Author.books))
+    params = create_dt_params(columns, search="germ")
+    statement = select().select_from(Author)
+    bind = related_session.get_bind()
+
+    res = DataTables(params, statement, columns, connection=bind).output_result()
+
+    assert [r["name"] for r in res["data"]] == ["Zola"]
+    assert res["yadcf_data_1"] == [600]
+
+
+def test_related_many_to_one(related_session):
+    """Test if to-one relationships search with has()."""
+    columns = [
+        ColumnDT(Book.title, mData="title"),
+        ColumnDT(Author.name, mData="author", related=Book.author),
+    ]
+    params = create_dt_params(columns)
+    params["columns[1][search][value]"] = "zol"
+    query = related_session.query().select_from(Book)
+
+    res = DataTables(params, query, columns).output_result()
+
+    assert res["data"] == [{"title": "Germinal", "author": "Zola"}]
+
+
+def test_related_should_be_a_relationship():
+    """Test if related should be a relationship attribute."""
+    with pytest.raises(ValueError):
+        ColumnDT(Book.title, related=Author.name)
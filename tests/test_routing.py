@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.pool import StaticPool
+
+from datatables import ColumnDT, DataTables
+
+from .helpers import create_dt_params
+from .models import Address, Base, User
+
+
+@pytest.fixture(scope="module")
+def replica():
+    """Use an empty database, to tell which statements were routed."""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+
+    yield engine
+
+    engine.dispose()
+
+
+def get_columns():
+    return [
+        ColumnDT(User.id),
+        ColumnDT(Address.description, search_method="yadcf_select"),
+    ]
+
+
+def test_routing_dict(session, replica):
+    """Test if counts and facets are run on the routed engine."""
+    columns = get_columns()
+    query = session.query().select_from(User).join(Address)
+    params = create_dt_params(columns)
+
+    routing = {"total_count": replica, "facets": replica}
+    res = DataTables(params, query, columns, routing=routing).output_result()
+
+    assert res["recordsTotal"] == "0"
+    assert res["recordsFiltered"] == "3"
+    assert res["yadcf_data_1"] == []
+    assert len(res["data"]) == 3
+
+
+def test_routing_callable(engine, file_engine, replica):
+    """Test if a Core select is routed by a callable with an executor."""
+    columns = get_columns()
+    statement = select().select_from(User).join(Address)
+    params = create_dt_params(columns)
+
+    def routing(kind):
+        return replica if kind == "filtered_count" else None
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        res = DataTables(
+            params,
+            statement,
+            columns,
+            connection=replica,
+            executor=executor,
+            routing=lambda kind: file_engine if kind == "page" else None,
+        ).output_result()
+    assert res["recordsTotal"] == "0"
+    assert len(res["data"]) == 3
+
+    res = DataTables(
+        params, statement, columns, connection=engine, routing=routing
+    ).output_result()
+    assert res["recordsTotal"] == "3"
+    assert res["recordsFiltered"] == "0"
+
+
+def test_routing_invalid_kind(session, replica):
+    """Test if unknown kinds of statements are rejected."""
+    columns = get_columns()
+    params = create_dt_params(columns)
+
+    with pytest.raises(ValueError):
+        DataTables(params, session.query(), columns, routing={"counts": replica})
@@ -1,13 +1,18 @@
+from datetime import datetime
+
 from sqlalchemy import func
+from sqlalchemy.dialects import postgresql
 
 from datatables import ColumnDT, DataTables
+from datatables.parsers import parse_date
+from datatables.search_methods import yadcf_multi_select
 
 from .helpers import create_dt_params
 from .models import Address, User
 
 
-def get_result(session, column, search_method, search_value):
-    columns = [ColumnDT(column, search_method=search_method)]
+def get_result(session, column, search_method, search_value, **kwargs):
+    columns = [ColumnDT(column, search_method=search_method, **kwargs)]
     query = session.query()
     params = create_dt_params(columns)
     params["columns[0][search][value]"] = search_value
@@ -133,6 +138,19 @@ def test_date_lt(session):
     assert res["recordsFiltered"] == "1"
 
 
+def test_date_illegal_input(session):
+    """Test if an unparsable date is reported instead of compared with now."""
+    res = get_result(
+        session=session,
+        column=User.birthday,
+        search_method="date",
+        search_value="<not a date",
+    )
+
+    assert "error" in res
+    assert res["recordsFiltered"] == "0"
+
+
 def test_yadcf_range_date(session):
     res = get_result(
         session=session,
@@ -144,6 +162,38 @@ def test_yadcf_range_date(session):
     assert res["recordsFiltered"] == "1"
 
 
+def test_date_format(session):
+    res = get_result(
+        session=session,
+        column=User.birthday,
+        search_method="date",
+        search_value="<03/01/1970",
+        date_format="%d/%m/%Y",
+    )
+    assert res["recordsFiltered"] == "1"
+
+
+def test_yadcf_range_date_format(session):
+    res = get_result(
+        session=session,
+        column=User.birthday,
+        search_method="yadcf_range_date",
+        search_value="03/01/1970-yadcf_delim-13/01/1970",
+        date_format="%d/%m/%Y",
+    )
+    assert res["recordsFiltered"] == "1"
+
+
+def test_parse_date():
+    assert parse_date("1970-01-03") == datetime(1970, 1, 3)
+    assert parse_date("Jan 3 1970") == datetime(1970, 1, 3)
+    assert parse_date("03/01/1970", "%d/%m/%Y") == datetime(1970, 1, 3)
+
+    hits = parse_date.cache_info().hits
+    parse_date("1970-01-03")
+    assert parse_date.cache_info().hits == hits + 1
+
+
 def test_yadcf_autocomplete(session):
     res = get_result(
         session=session,
@@ -155,6 +205,46 @@ def test_yadcf_autocomplete(session):
     assert res["recordsFiltered"] == "1"
 
 
+def get_autocomplete(session, column, search_value, **kwargs):
+    columns = [ColumnDT(column, search_method="yadcf_autocomplete")]
+    params = create_dt_params(columns)
+    params["columns[0][search][value]"] = search_value
+    query = session.query().select_from(User)
+    return DataTables(params, query, columns, **kwargs).output_result()
+
+
+def test_yadcf_autocomplete_prefix_limit(session):
+    """Test if autocomplete sends the first values starting with the prefix."""
+    names = sorted(name for (name,) in session.query(User.name))
+    prefix = names[0][0]
+
+    res = get_autocomplete(session, User.name, prefix, autocomplete_limit=2)
+
+    assert res["yadcf_data_0"] == [n for n in names if n.startswith(prefix)][:2]
+
+
+def test_yadcf_autocomplete_by_frequency(session):
+    """Test if autocomplete can send the most frequent values first."""
+    initial = func.substr(User.name, 1, 1)
+    counts = {}
+    for (name,) in session.query(User.name):
+        counts[name[0]] = counts.get(name[0], 0) + 1
+    expected = sorted(counts, key=lambda k: (-counts[k], k))[:3]
+
+    res = get_autocomplete(
+        session, initial, "", autocomplete_limit=3, autocomplete_by_frequency=True
+    )
+
+    assert res["yadcf_data_0"] == expected
+
+
+def test_yadcf_autocomplete_escapes_wildcards(session):
+    """Test if LIKE wildcards of the prefix match literally."""
+    res = get_autocomplete(session, User.name, "%", autocomplete_limit=5)
+
+    assert res["yadcf_data_0"] == []
+
+
 def test_yadcf_select(session):
     res = get_result(
         session=session,
@@ -166,6 +256,59 @@ def test_yadcf_select(session):
     assert res["recordsFiltered"] == "1"
 
 
+def get_facets(session, column, search_method="yadcf_select", **kwargs):
+    columns = [
+        ColumnDT(column, search_method=search_method),
+        ColumnDT(User.id, search_method="numeric"),
+    ]
+    params = create_dt_params(columns)
+    params["columns[1][search][value]"] = "<=20"
+    query = session.query().select_from(User)
+    return DataTables(params, query, columns, **kwargs).output_result()
+
+
+def test_yadcf_select_facets(session):
+    """Test if select options are counted, capped and followed by Other."""
+    initial = func.substr(User.name, 1, 1)
+    counts = {}
+    for (name,) in session.query(User.name).filter(User.id <= 20):
+        counts[name[0]] = counts.get(name[0], 0) + 1
+    top = sorted(counts, key=lambda k: (-counts[k], k))[:3]
+
+    res = get_facets(session, initial, facet_limit=3)
+
+    facets = [{"value": k, "label": k, "count": counts[k]} for k in top]
+    other = 20 - sum(counts[k] for k in top)
+    facets.append({"value": None, "label": "Other", "count": other, "other": True})
+    assert res["yadcf_data_0"] == facets
+
+
+def test_yadcf_select_facets_null(session):
+    """Test if NULL values are labelled, and told apart from Other."""
+    res = get_facets(session, func.nullif(User.id % 2, 0), facet_limit=1)
+
+    null, other = res["yadcf_data_0"]
+    assert null == {"value": None, "label": "(empty)", "count": 10}
+    assert other == {"value": None, "label": "Other", "count": 10, "other": True}
+
+
+def test_yadcf_select_facets_zero(session):
+    """Test if a facet_limit of 0 sends a single Other option counting every row."""
+    res = get_facets(session, User.id % 3, facet_limit=0)
+
+    assert res["yadcf_data_0"] == [
+        {"value": None, "label": "Other", "count": 20, "other": True}
+    ]
+
+
+def test_yadcf_multi_select_facets_without_other(session):
+    """Test if no Other option is sent when all the values fit."""
+    res = get_facets(session, User.id, "yadcf_multi_select", facet_limit=50)
+
+    assert len(res["yadcf_data_0"]) == 20
+    assert all(facet["count"] == 1 for facet in res["yadcf_data_0"])
+
+
 def test_yadcf_multi_select(session):
     res = get_result(
         session=session,
@@ -177,6 +320,32 @@ def test_yadcf_multi_select(session):
     assert res["recordsFiltered"] == "1"
 
 
+def test_yadcf_multi_select_coerced(session):
+    res = get_result(
+        session=session,
+        column=User.id,
+        search_method="yadcf_multi_select",
+        search_value="1|2|abc",
+    )
+    assert res["recordsFiltered"] == "2"
+
+
+def test_yadcf_multi_select_large(session):
+    res = get_result(
+        session=session,
+        column=User.id,
+        search_method="yadcf_multi_select",
+        search_value="|".join(str(i) for i in range(100)),
+    )
+    assert res["recordsFiltered"] == "50"
+
+
+def test_yadcf_multi_select_postgresql():
+    expr = yadcf_multi_select(User.id, "|".join(str(i) for i in range(100)))
+    sql = str(expr.compile(dialect=postgresql.dialect()))
+    assert sql == "users.id = ANY (%(param_1)s::INTEGER[])"
+
+
 def test_group_by(session):
     """Test group by after a join query."""
     columns = [ColumnDT(func.count(User.id)), ColumnDT(Address.id)]
@@ -188,3 +357,28 @@ def test_group_by(session):
     res = rowTable.output_result()
 
     assert len(res["data"]) == 3
+
+
+def test_global_search_not_searchable(session):
+    """Test if columns not searchable by the client are left out of the search."""
+    columns = [ColumnDT(User.id), ColumnDT(User.name)]
+    query = session.query().select_from(User)
+    params = create_dt_params(columns, search="1")
+    params["columns[0][searchable]"] = "false"
+
+    res = DataTables(params, query, columns).output_result()
+
+    assert res["recordsFiltered"] == "0"
+
+
+def test_global_search_no_searchable_column(session):
+    """Test if a global search without searchable columns matches no row."""
+    columns = [ColumnDT(User.id), ColumnDT(User.name, global_search=False)]
+    query = session.query().select_from(User)
+    params = create_dt_params(columns, search="1")
+    params["columns[0][searchable]"] = "false"
+
+    res = DataTables(params, query, columns).output_result()
+
+    assert res["recordsFiltered"] == "0"
+    assert res["data"] == []
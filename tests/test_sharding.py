@@ -0,0 +1,222 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from datatables import ColumnDT, DataTables
+from datatables.sharding import ShardedDataTables
+
+from .helpers import create_dt_params
+from .models import Base, User
+
+
+def memory_engine():
+    """Share one in-memory database between the threads of the shards."""
+    return create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+
+
+def create_users(engine, ids):
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        for i in ids:
+            birthday = None
+            if i % 4:
+                birthday = datetime.date(1980, 1, 1) + datetime.timedelta(days=i % 7)
+            session.add(User(id=i, name="User {:02d}".format(i), birthday=birthday))
+        session.commit()
+
+
+@pytest.fixture(scope="module")
+def engines():
+    shards = [memory_engine() for _ in range(3)]
+    create_users(shards[0], range(1, 31, 3))
+    create_users(shards[1], range(2, 31, 3))
+    create_users(shards[2], range(3, 31, 3))
+    combined = create_engine("sqlite://")
+    create_users(combined, range(1, 31))
+    return shards, combined
+
+
+def get_columns():
+    return [
+        ColumnDT(User.id, mData="id", search_method="numeric"),
+        ColumnDT(User.name, mData="name", search_method="yadcf_select"),
+        ColumnDT(User.birthday, mData="birthday"),
+    ]
+
+
+def compare(engines, **kwargs):
+    shards, combined = engines
+    columns = get_columns()
+    params = create_dt_params(columns, **kwargs)
+    params["columns[0][search][value]"] = ">3"
+    query = Session().query().select_from(User)
+    with Session(combined) as session:
+        expected = DataTables(
+            params, query.with_session(session), columns
+        ).output_result()
+    sessions = [Session(engine) for engine in shards]
+    try:
+        sharded = ShardedDataTables(
+            params, [(session, query) for session in sessions], columns
+        )
+    finally:
+        for session in sessions:
+            session.close()
+    output = sharded.output_result()
+    output["yadcf_data_1"] = sorted(output["yadcf_data_1"])
+    expected["yadcf_data_1"] = sorted(expected["yadcf_data_1"])
+    assert output == expected
+    return output
+
+
+@pytest.mark.parametrize(
+    "order",
+    [
+        [{"column": 0, "dir": "asc"}],
+        [{"column": 1, "dir": "desc"}],
+        [{"column": 2, "dir": "asc"}, {"column": 0, "dir": "desc"}],
+        [{"column": 2, "dir": "desc"}, {"column": 0, "dir": "asc"}],
+    ],
+)
+@pytest.mark.parametrize(("start", "length"), [(0, 10), (5, 7), (20, 10), (0, -1)])
+def test_sharded_pages(engines, order, start, length):
+    """Test if merged pages are the pages of all the rows."""
+    compare(engines, order=order, start=start, length=length)
+
+
+def test_sharded_counts(engines):
+    """Test if counts are summed over the shards."""
+    output = compare(engines, search="User 1")
+
+    assert output["recordsTotal"] == "30"
+    assert output["recordsFiltered"] == "10"
+
+
+def test_sharded_core_executor(engines):
+    """Test if Core select shards run on a given executor."""
+    shards, _ = engines
+    columns = get_columns()
+    params = create_dt_params(columns, length=3, order=[{"column": 0, "dir": "desc"}])
+    statement = select().select_from(User)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        output = ShardedDataTables(
+            params, [(e, statement) for e in shards], columns, executor=executor
+        ).output_result()
+
+    assert [row["id"] for row in output["data"]] == [30, 29, 28]
+
+
+def test_sharded_facets(engines):
+    """Test if facets are summed over the shards and capped again."""
+    shards, _ = engines
+    columns = [ColumnDT(User.birthday, search_method="yadcf_select")]
+    params = create_dt_params(columns)
+    statement = select().select_from(User)
+
+    output = ShardedDataTables(
+        params, [(e, statement) for e in shards], columns, facet_limit=2
+    ).output_result()
+
+    facets = output["yadcf_data_0"]
+    assert len(facets) == 3
+    assert facets[-1]["other"]
+    assert sum(facet["count"] for facet in facets) == 30
+
+
+def test_sharded_facets_exact(engines):
+    """Test if merged facets count the values left out of each shard's top."""
+    shards, combined = engines
+    columns = [ColumnDT(User.birthday, search_method="yadcf_select")]
+    params = create_dt_params(columns)
+    statement = select().select_from(User)
+
+    output = ShardedDataTables(
+        params, [(e, statement) for e in shards], columns, facet_limit=2
+    ).output_result()
+    expected = DataTables(
+        params, statement, columns, connection=combined, facet_limit=2
+    ).output_result()
+
+    assert output["yadcf_data_0"] == expected["yadcf_data_0"]
+
+
+def test_sharded_facets_all(engines):
+    """Test if a facet_limit of -1 merges every value without an Other bucket."""
+    shards, combined = engines
+    columns = [ColumnDT(User.id % 3, search_method="yadcf_select")]
+    params = create_dt_params(columns)
+    statement = select().select_from(User)
+
+    output = ShardedDataTables(
+        params, [(e, statement) for e in shards], columns, facet_limit=-1
+    ).output_result()
+    expected = DataTables(
+        params, statement, columns, connection=combined, facet_limit=-1
+    ).output_result()
+
+    assert output["yadcf_data_0"] == expected["yadcf_data_0"]
+    assert not any(facet.get("other") for facet in output["yadcf_data_0"])
+
+
+def test_sharded_empty_shard(engines):
+    """Test if a shard without rows doesn't break the merge of yadcf values."""
+    shards, _ = engines
+    empty = memory_engine()
+    create_users(empty, [])
+    columns = [
+        ColumnDT(User.id, search_method="yadcf_range_number_slider"),
+        ColumnDT(User.birthday, search_method="yadcf_select"),
+    ]
+    params = create_dt_params(columns)
+    statement = select().select_from(User)
+
+    output = ShardedDataTables(
+        params, [(e, statement) for e in [empty] + shards], columns, facet_limit=2
+    ).output_result()
+
+    assert "error" not in output
+    assert output["yadcf_data_0"] == (1, 30)
+    assert output["yadcf_data_1"][-1]["other"]
+
+
+def test_sharded_shard_options(engines):
+    """Test if the shards run with the options of a draw."""
+    shards, _ = engines
+    columns = get_columns()
+    params = create_dt_params(columns)
+    statement = select().select_from(User)
+    sources = [(e, statement) for e in shards]
+
+    output = ShardedDataTables(params, sources, columns, max_rows=2).output_result()
+
+    assert output["truncated"]
+    assert [row["id"] for row in output["data"]] == [1, 2, 3, 4, 5, 6]
+    with pytest.raises(ValueError):
+        ShardedDataTables(params, sources, columns, on_limit="stream")
+
+
+def test_sharded_error(engines):
+    """Test if errors of a shard are output."""
+    shards, _ = engines
+    columns = get_columns()
+    params = create_dt_params(columns, length=-5)
+    statement = select().select_from(User)
+
+    output = ShardedDataTables(
+        params, [(e, statement) for e in shards], columns
+    ).output_result()
+
+    assert "error" in output
+
+
+def test_sharded_without_shards():
+    """Test if at least one shard is required."""
+    with pytest.raises(ValueError):
+        ShardedDataTables({}, [], get_columns())
@@ -0,0 +1,193 @@
+import asyncio
+import threading
+
+from sqlalchemy import select
+
+from datatables import ColumnDT, singleflight
+from datatables.singleflight import SingleFlight, fingerprint
+
+from .helpers import create_dt_params
+from .models import User
+
+
+def get_columns():
+    return [ColumnDT(User.id, mData="id"), ColumnDT(User.name, mData="name")]
+
+
+class _WaitingEvent(threading.Event):
+    """Event counting the threads which started waiting for it."""
+
+    waiting = None
+
+    def wait(self, timeout=None):
+        self.waiting.release()
+        return super(_WaitingEvent, self).wait(timeout)
+
+
+def wait_followers(monkeypatch, count):
+    """Return a function waiting until `count` callers wait for a leader."""
+    waiting = threading.Semaphore(0)
+
+    class Call(singleflight._Call):
+        def __init__(self):
+            super(Call, self).__init__()
+            self.done = _WaitingEvent()
+            self.done.waiting = waiting
+
+    monkeypatch.setattr(singleflight, "_Call", Call)
+
+    def wait():
+        for _ in range(count):
+            assert waiting.acquire(timeout=5)
+
+    return wait
+
+
+def test_single_flight_shares_call(monkeypatch):
+    """Test if concurrent identical calls share one execution."""
+    flight = SingleFlight()
+    followers_waiting = wait_followers(monkeypatch, 5)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def function():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"value": len(calls)}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", function)))
+    leader.start()
+    started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(flight.do("k", function)))
+        for _ in range(5)
+    ]
+    for thread in followers:
+        thread.start()
+    # wait until the followers wait for the call of the leader
+    followers_waiting()
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"value": 1}] * 6
+    assert flight._calls == {}
+
+
+def test_single_flight_shares_errors(monkeypatch):
+    """Test if the exception of a call is raised to every caller."""
+    flight = SingleFlight()
+    followers_waiting = wait_followers(monkeypatch, 5)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def function():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("k", function)
+        except ValueError as exc:
+            errors.append(exc)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=call) for _ in range(5)]
+    for thread in followers:
+        thread.start()
+    followers_waiting()
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(errors) == 6
+    assert all(exc is errors[0] for exc in errors)
+    assert str(errors[0]) == "boom"
+    assert flight.do("k", lambda: 1) == 1
+
+
+def test_single_flight_async():
+    """Test if identical coroutines share one execution."""
+    flight = SingleFlight()
+    calls = []
+
+    async def function():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def main():
+        return await asyncio.gather(*[flight.do_async("k", function) for _ in range(5)])
+
+    assert asyncio.run(main()) == [1] * 5
+    assert len(calls) == 1
+
+
+def test_output_result_draw_echo(session):
+    """Test if each caller gets its own draw echo."""
+    flight = SingleFlight()
+    columns = get_columns()
+    query = session.query().select_from(User)
+    params = create_dt_params(columns)
+
+    first = flight.output_result(dict(params, draw="3"), query, columns)
+    second = flight.output_result(dict(params, draw="4"), query, columns)
+
+    assert first["draw"] == "3"
+    assert second["draw"] == "4"
+    assert first["data"] == second["data"]
+    first["data"][0]["name"] = "changed"
+    assert second["data"][0]["name"] != "changed"
+
+
+def test_output_result_async(file_engine):
+    """Test if asyncio servers get the output of the DataTables."""
+    flight = SingleFlight()
+    columns = get_columns()
+    params = create_dt_params(columns)
+    statement = select().select_from(User)
+
+    async def main():
+        return await asyncio.gather(
+            *[
+                flight.output_result_async(
+                    dict(params, draw=str(i)),
+                    statement,
+                    columns,
+                    connection=file_engine,
+                )
+                for i in range(1, 4)
+            ]
+        )
+
+    outputs = asyncio.run(main())
+
+    assert [o["draw"] for o in outputs] == ["1", "2", "3"]
+    assert all(o["recordsTotal"] == "50" for o in outputs)
+
+
+def test_fingerprint(session):
+    """Test if fingerprints ignore the draw but not the searches."""
+    columns = get_columns()
+    query = session.query().select_from(User)
+    params = create_dt_params(columns)
+
+    key = fingerprint(params, query, columns)
+
+    assert fingerprint(dict(params, draw="2", _="123"), query, columns) == key
+    assert fingerprint(dict(params, start="10"), query, columns) != key
+    assert fingerprint(params, query.filter(User.id > 2), columns) != key
+    assert fingerprint(params, query, columns[:1]) != key
+    assert fingerprint(params, query, columns, max_rows=10) != key
@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy.orm import Query
+
+from datatables import ColumnDT, DataTables, DataTablesSpec
+
+from .helpers import create_dt_params
+from .models import Address, User
+
+
+@pytest.fixture(scope="module")
+def spec():
+    columns = [
+        ColumnDT(User.id, search_method="numeric"),
+        ColumnDT(User.name, mData="name"),
+        ColumnDT(Address.description, search_method="yadcf_select"),
+    ]
+    query = Query([]).select_from(User).join(Address)
+    return DataTablesSpec(query, columns)
+
+
+def test_spec_resolves_columns(spec):
+    """Test if the static parts of the columns are resolved."""
+    assert spec.column_names == ["0", "name", "2"]
+    assert len(spec.search_functions) == 3
+
+
+def test_spec_same_output(session, spec):
+    """Test if executing a spec gives the same output as DataTables."""
+    params = create_dt_params(spec.columns, search="Road")
+    params["columns[0][search][value]"] = ">10"
+
+    expected = DataTables(params, spec.query.with_session(session), spec.columns)
+    res = spec.execute(params, session).output_result()
+
+    assert res == expected.output_result()
+    assert res["yadcf_data_2"] == ["Road"]
+
+
+def test_spec_lazy(session, spec):
+    """Test if only the requested data is fetched."""
+    params = create_dt_params(spec.columns)
+    rowTable = spec.execute(params, session)
+
+    assert rowTable.results is None
+    assert len(rowTable.page()) == 3
+    assert rowTable.cardinality == 0
+    assert rowTable.counts() == (3, 3)
+    assert rowTable.yadcf_params == []
+    assert "yadcf_data_2" in rowTable.yadcf_data()
+
+
+def test_spec_lazy_errors(session, spec):
+    """Test if lazy accessors raise and output_result reports errors."""
+    params = create_dt_params(spec.columns, length=-10)
+
+    with pytest.raises(ValueError):
+        spec.execute(params, session).page()
+    assert "Length should be" in spec.execute(params, session).output_result()["error"]
+
+
+def test_spec_invalid_columns():
+    """Test if invalid columns are rejected up front."""
+    query = Query([]).select_from(User)
+    with pytest.raises(ValueError):
+        DataTablesSpec(query, [])
+    with pytest.raises(ValueError):
+        DataTablesSpec(query, [User.id])
+    with pytest.raises(ValueError):
+        DataTablesSpec(
+            query, [ColumnDT(User.id, mData="a"), ColumnDT(User.name, mData="a")]
+        )
@@ -0,0 +1,39 @@
+from sqlalchemy import create_engine, text
+
+from benchmarks.stress import percentile, populate, run
+
+
+def test_stress_harness_reports(tmpdir):
+    """Test if the stress harness replays draws and reports their measures."""
+    url = "sqlite:///" + str(tmpdir.join("stress.sqlite"))
+
+    result = run(url=url, rows=200, draws=40, threads=8, pool_size=4)
+
+    assert result["draws"] == 40
+    assert result["errors"] == 0
+    assert result["throughput"] > 0
+    assert result["latency_ms"]["p50"] <= result["latency_ms"]["p99"]
+    assert result["statements_per_draw"] >= 3
+
+
+def test_percentile():
+    """Test if percentiles use the nearest rank."""
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0.0
+
+
+def test_stress_populate_more_rows(tmpdir):
+    """Test if populating an existing database only inserts the rows missing."""
+    url = "sqlite:///" + str(tmpdir.join("stress.sqlite"))
+    engine = create_engine(url)
+
+    populate(engine, 50)
+    populate(engine, 80)
+
+    with engine.connect() as connection:
+        count = connection.execute(text("SELECT count(*) FROM stress_customers"))
+        assert count.scalar_one() == 80
+    engine.dispose()
@@ -0,0 +1,81 @@
+import time
+
+from sqlalchemy.orm import aliased
+
+from datatables import ColumnDT, DataTables, TrackedCount
+
+from .helpers import create_dt_params
+from .models import Address, User
+
+
+def cross_join_query(session, n):
+    """Return a query whose page is fast but whose counts are slow."""
+    query = session.query().select_from(User)
+    for _ in range(n):
+        alias = aliased(User)
+        query = query.join(alias, alias.id > 0)
+    return query, alias
+
+
+def test_time_budget_not_exceeded(session):
+    """Test if a draw within its time budget is not degraded."""
+    columns = [
+        ColumnDT(User.id),
+        ColumnDT(Address.description, search_method="yadcf_select"),
+    ]
+
+    query = session.query().select_from(User).join(Address)
+
+    params = create_dt_params(columns)
+    res = DataTables(params, query, columns, time_budget=10).output_result()
+
+    assert "degraded" not in res
+    assert res["recordsTotal"] == "3"
+    assert len(res["yadcf_data_1"]) == 3
+
+
+def test_time_budget_exceeded(file_session):
+    """Test if the page is returned with estimated counts once out of time."""
+    columns = [ColumnDT(User.id), ColumnDT(User.name, search_method="yadcf_select")]
+
+    query, _ = cross_join_query(file_session, 4)
+
+    params = create_dt_params(columns, start=20)
+    started = time.monotonic()
+    res = DataTables(params, query, columns, time_budget=0.2).output_result()
+
+    assert time.monotonic() - started < 5
+    assert "error" not in res
+    assert len(res["data"]) == 10
+    assert res["degraded"] == ["recordsTotal", "recordsFiltered", "yadcf_data_1"]
+    assert res["recordsFiltered"] == "31"
+    assert res["recordsTotal"] is None
+    assert "yadcf_data_1" not in res
+
+
+def test_time_budget_exceeded_tracked_total(file_session):
+    """Test if a total out of time is the last known tracked count."""
+    columns = [ColumnDT(User.id)]
+    tracked = TrackedCount(User, file_session.get_bind(), reconcile_every=0)
+    tracked.get(lambda: 12)
+
+    query, _ = cross_join_query(file_session, 4)
+
+    params = create_dt_params(columns)
+    res = DataTables(
+        params, query, columns, time_budget=0.2, tracked_count=tracked
+    ).output_result()
+
+    assert "recordsTotal" in res["degraded"]
+    assert res["recordsTotal"] == "12"
+
+
+def test_time_budget_exceeded_page(file_session):
+    """Test if running out of time for the page is an error."""
+    query, alias = cross_join_query(file_session, 4)
+    columns = [ColumnDT(User.id + alias.id)]
+
+    params = create_dt_params(columns, search="no match")
+    res = DataTables(params, query, columns, time_budget=0.2).output_result()
+
+    assert "Time budget of 0.2s exceeded" in res["error"]
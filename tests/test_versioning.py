@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import event, update
+
+from datatables import ColumnDT, DataTables
+from datatables.versioning import (
+    ChangeCounter,
+    conditional_output,
+    etag_matches,
+    make_etag,
+    max_version,
+)
+
+from .helpers import create_dt_params
+from .models import User
+
+
+def get_table(session, data_version, draw=1, **kwargs):
+    columns = [ColumnDT(User.id, mData="id"), ColumnDT(User.name, mData="name")]
+    params = create_dt_params(columns, **kwargs)
+    params["draw"] = str(draw)
+    query = session.query().select_from(User)
+    return DataTables(params, query, columns, lazy=True, data_version=data_version)
+
+
+def test_etag_ignores_draw():
+    """Test if ETags depend on the request and version, not on the draw."""
+    etag = make_etag({"draw": "1", "start": "0"}, 1)
+
+    assert make_etag({"draw": "2", "start": "0", "_": "9"}, 1) == etag
+    assert make_etag({"draw": "1", "start": "10"}, 1) != etag
+    assert make_etag({"draw": "1", "start": "0"}, 2) != etag
+
+
+def test_etag_matches():
+    """Test if If-None-Match headers are compared weakly."""
+    assert etag_matches('"a"', '"b", W/"a"')
+    assert etag_matches('"a"', "*")
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches('"a"', None)
+
+
+def test_not_modified_runs_no_draw(session):
+    """Test if matching ETags are answered with the version statement only."""
+    statements = []
+    engine = session.get_bind()
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    etag, output = conditional_output(get_table(session, max_version(User.id)), None)
+    assert output["recordsTotal"] == "50"
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        table = get_table(session, max_version(User.id), draw=2)
+        assert conditional_output(table, etag) == (etag, None)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(statements) == 1
+    assert table.results is None
+
+
+def test_etag_changes_with_request(session):
+    """Test if another page of the same data has another ETag."""
+    etag = get_table(session, max_version(User.id)).etag()
+
+    table = get_table(session, max_version(User.id), start=10)
+
+    assert not table.not_modified(etag)
+
+
+def test_change_counter(session):
+    """Test if committed changes of the entities change the version."""
+    counter = ChangeCounter(User)
+    try:
+        etag = get_table(session, counter).etag()
+        user = session.query(User).first()
+        name = user.name
+
+        user.name = "Changed"
+        session.rollback()
+        assert get_table(session, counter).not_modified(etag)
+
+        session.execute(update(User).where(User.id == user.id).values(name="X"))
+        session.commit()
+        assert not get_table(session, counter).not_modified(etag)
+
+        etag = get_table(session, counter).etag()
+        user.name = name
+        session.commit()
+        assert not get_table(session, counter).not_modified(etag)
+    finally:
+        counter.close()
+
+
+def test_etag_requires_data_version(session):
+    """Test if ETags need a data version."""
+    with pytest.raises(ValueError):
+        get_table(session, None).etag()